@@ -1,12 +1,20 @@
+import numpy as np
 import pandas as pd
-import requests
+import httpx
+import asyncio
+import orjson
 import time
-import json
 import os
 from datetime import datetime
 
 # --- Configuration ---
 LLM_MODEL_NAME = "gpt-4.1"
+ASK_URL = "http://localhost:3000/ask"
+# Number of questions in flight at once. Defaults to serial runs so latency_seconds stays
+# comparable with earlier results; higher values share the client, MCP server and API key,
+# which inflates per-question latency and error rates.
+MAX_CONCURRENCY = int(os.environ.get("BENCH_CONCURRENCY", "1"))
+ASK_HEADERS = {"Content-Type": "application/json"}
 
 # --- Ensure results directory exists ---
 RESULTS_DIR = "results"
@@ -19,84 +27,106 @@ output_filename = f"{RESULTS_DIR}/result_{timestamp}.csv"
 # Load dataset
 data = pd.read_csv("dataset.csv")
 
-# --- Pre-create columns with default values to later update in-place ---
-data["model_response"] = ""
-data["latency_seconds"] = 0.0
-data["tool_calls"] = ""
-data["num_tool_calls"] = 0
-data["status_code"] = 0
-data["total_input_tokens"] = 0
-data["total_output_tokens"] = 0
-data["total_tokens"] = 0
-data["prompt_tokens"] = 0
-data["completion_tokens"] = 0
-data["total_cost"] = 0.0
-data["llm_model_name"] = ""
-
-# Save an initial version so that the file exists
-data.to_csv(output_filename, index=False)
+# --- Result columns, preallocated and filled by row index as questions complete ---
+# Numeric columns are typed numpy arrays; missing token counts/costs stay NaN.
+N = len(data)
+results = {
+    "model_response": [None] * N,
+    "latency_seconds": np.empty(N, dtype=np.float64),
+    "tool_calls": [None] * N,
+    "num_tool_calls": np.zeros(N, dtype=np.int32),
+    "status_code": np.full(N, -1, dtype=np.int32),
+    "total_input_tokens": np.full(N, np.nan),
+    "total_output_tokens": np.full(N, np.nan),
+    "total_tokens": np.full(N, np.nan),
+    "prompt_tokens": np.full(N, np.nan),
+    "completion_tokens": np.full(N, np.nan),
+    "total_cost": np.full(N, np.nan),
+    "llm_model_name": [LLM_MODEL_NAME] * N,
+}
+RESULT_COLUMNS = list(results)
 
-# Process each row, update intermediate progress and re-save the file
-for i, item in data.iterrows():
-    question = item["question"]
-    print(f"({i+1}/{len(data)}) Asking: {question}")
+# Write the header once; completed rows are appended as they finish
+pd.DataFrame(columns=[*data.columns, *RESULT_COLUMNS]).to_csv(output_filename, index=False)
 
-    payload = {
-        "question": question,
-        "stream": False,
-        "llm": LLM_MODEL_NAME
-    }
-    try:
-        t0 = time.time()
-        resp = requests.post(
-            "http://localhost:3000/ask",
-            json=payload,
-            timeout=500
-        )
-        t1 = time.time()
-        status_code = resp.status_code
-        resp.raise_for_status()
-        answer_json = resp.json()
-        answer = answer_json.get("result")
-        tool_calls = answer_json.get("tool_calls", [])
-        usage_metadata = answer_json.get("usage_metadata", {})
-
-        total_input_tokens  = usage_metadata.get("prompt_tokens")
-        total_output_tokens = usage_metadata.get("completion_tokens")
-        total_tokens        = usage_metadata.get("total_tokens")
-        prompt_tokens       = usage_metadata.get("prompt_tokens")
-        completion_tokens   = usage_metadata.get("completion_tokens")
-        total_cost          = usage_metadata.get("total_cost")
-
-    except Exception as e:
-        t1 = time.time()
-        status_code = getattr(e.response, 'status_code', None) if hasattr(e, 'response') else None
-        answer = f"ERROR: {str(e)}"
-        tool_calls = []
-        total_input_tokens  = -1
-        total_output_tokens = -1
-        total_tokens        = -1
-        prompt_tokens       = -1
-        completion_tokens   = -1
-        total_cost          = -1.0
+
+async def ask(client, sem, checkpoint, i, question):
+    """Ask one question and append its result row to the checkpoint."""
+    async with sem:
+        print(f"({i+1}/{len(data)}) Asking: {question}")
+
+        body = orjson.dumps({
+            "question": question,
+            "stream": False,
+            "llm": LLM_MODEL_NAME
+        })
+        t0 = time.perf_counter()
+        try:
+            resp = await client.post(ASK_URL, content=body, headers=ASK_HEADERS, timeout=500)
+            t1 = time.perf_counter()
+            status_code = resp.status_code
+            resp.raise_for_status()
+            answer_json = orjson.loads(resp.content)
+            answer = answer_json.get("result")
+            tool_calls = answer_json.get("tool_calls", [])
+            usage_metadata = answer_json.get("usage_metadata", {})
+
+            total_input_tokens  = usage_metadata.get("prompt_tokens")
+            total_output_tokens = usage_metadata.get("completion_tokens")
+            total_tokens        = usage_metadata.get("total_tokens")
+            prompt_tokens       = usage_metadata.get("prompt_tokens")
+            completion_tokens   = usage_metadata.get("completion_tokens")
+            total_cost          = usage_metadata.get("total_cost")
+
+        except Exception as e:
+            t1 = time.perf_counter()
+            status_code = getattr(e.response, 'status_code', -1) if hasattr(e, 'response') else -1
+            answer = f"ERROR: {str(e)}"
+            tool_calls = []
+            total_input_tokens  = -1
+            total_output_tokens = -1
+            total_tokens        = -1
+            prompt_tokens       = -1
+            completion_tokens   = -1
+            total_cost          = -1.0
 
     latency = t1 - t0
 
-    # Update the row with results
-    data.at[i, "model_response"] = answer
-    data.at[i, "latency_seconds"] = latency
-    data.at[i, "tool_calls"] = json.dumps(tool_calls, ensure_ascii=False)
-    data.at[i, "num_tool_calls"] = len(tool_calls) if isinstance(tool_calls, list) else 0
-    data.at[i, "status_code"] = status_code
-    data.at[i, "total_input_tokens"] = total_input_tokens
-    data.at[i, "total_output_tokens"] = total_output_tokens
-    data.at[i, "total_tokens"] = total_tokens
-    data.at[i, "prompt_tokens"] = prompt_tokens
-    data.at[i, "completion_tokens"] = completion_tokens
-    data.at[i, "total_cost"] = total_cost
-    data.at[i, "llm_model_name"] = LLM_MODEL_NAME
-
-    # Save intermediate progress
-    data.to_csv(output_filename, index=False)
-
-print(f"Done. Results saved (and updated incrementally) to {output_filename}.")
\ No newline at end of file
+    row = {
+        "model_response": answer,
+        "latency_seconds": latency,
+        "tool_calls": orjson.dumps(tool_calls).decode(),
+        "num_tool_calls": len(tool_calls) if isinstance(tool_calls, list) else 0,
+        "status_code": status_code,
+        "total_input_tokens": total_input_tokens,
+        "total_output_tokens": total_output_tokens,
+        "total_tokens": total_tokens,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_cost": total_cost,
+        "llm_model_name": LLM_MODEL_NAME,
+    }
+
+    for col, value in row.items():
+        results[col][i] = value
+
+    # Append only this row as progress; the DataFrame is filled after the loop
+    pd.DataFrame([{**data.iloc[i].to_dict(), **row}]).to_csv(checkpoint, header=False, index=False)
+    checkpoint.flush()
+
+
+async def main():
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    limits = httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=MAX_CONCURRENCY)
+    with open(output_filename, "a", buffering=1 << 20, newline="") as checkpoint:
+        async with httpx.AsyncClient(limits=limits) as client:
+            await asyncio.gather(*(ask(client, sem, checkpoint, i, q) for i, q in enumerate(data["question"])))
+
+
+asyncio.run(main())
+data = data.assign(**results)
+
+# Rows were appended in completion order; rewrite once in dataset order
+data.to_csv(output_filename, index=False)
+
+print(f"Done. Results saved (and updated incrementally) to {output_filename}.")
@@ -33,6 +33,7 @@ Usage:
 import os
 import argparse
 import json
+from collections import Counter
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
@@ -40,10 +41,6 @@ import matplotlib.ticker as mtick
 import seaborn as sns
 from matplotlib.ticker import FuncFormatter
 
-# Use a clean, professional style.
-#plt.style.use("seaborn")
-sns.set(style="whitegrid")
-
 # Directory where plots are saved.
 SAVE_DIR = "plots"
 
@@ -68,12 +65,17 @@ def load_data(file_path):
     # Ensure required columns are present.
     if "success" not in df.columns:
         df["success"] = df["num_tool_calls"] > 0
+    elif pd.api.types.is_numeric_dtype(df["success"]):
+        # Hand-annotated 1/0 columns (bool columns pass through unchanged).
+        df["success"] = df["success"].fillna(0).astype(bool)
+    else:
+        # Normalize "True"/"true"/"1" strings once so plots can treat success as a bool mask.
+        df["success"] = df["success"].astype(str).str.strip().str.lower().isin(["true", "1"])
     return df
 
 def bar_colors(success_series):
     # Green for success, red for failure.
-    return ['#43A047' if str(s).lower() == 'true' or s is True else '#E53935'
-            for s in success_series]
+    return np.where(success_series.to_numpy(dtype=bool), '#43A047', '#E53935')
 
 def plot_question_tool_calls(experiments):
     """
@@ -84,6 +86,7 @@ def plot_question_tool_calls(experiments):
     base_key = list(experiments.keys())[0]
     base_df = experiments[base_key].sort_values("question").reset_index(drop=True)
     questions = base_df["question"]
+    order = questions.to_list()
     y = np.arange(len(questions))
     
     num_exps = len(experiments)
@@ -94,7 +97,14 @@ def plot_question_tool_calls(experiments):
     fig, ax = plt.subplots(figsize=(13, 7))
     
     for i, (label, df) in enumerate(experiments.items()):
-        df_sorted = df.sort_values("question").reset_index(drop=True)
+        # Align to the base order with a hash reindex rather than sorting again; reindex needs
+        # unique questions, and a question missing from this experiment counts as a failure.
+        if label == base_key:
+            df_sorted = base_df
+        else:
+            df_sorted = (df.drop_duplicates("question").set_index("question")
+                         .reindex(order).reset_index())
+            df_sorted["success"] = df_sorted["success"].fillna(False).astype(bool)
         pos = y + (i - offset_adjust) * bar_height
         colors = bar_colors(df_sorted["success"])
         ax.barh(pos, df_sorted["num_tool_calls"], bar_height,
@@ -142,10 +152,16 @@ def plot_category_stats(experiments):
     num_exps = len(agg_results)
     width = 0.7 / num_exps
 
+    # Align every experiment to the category order once, not once per metric.
+    agg_aligned = {label: group.reindex(categories) for label, group in agg_results.items()}
+
+    # One figure is reused for every metric; the axes are cleared between saves.
+    fig, ax = plt.subplots(figsize=(12, 6))
+
     def plot_metric(metric, ylabel, title, file_name, yformatter=None, ylim=None, yticks=None):
-        fig, ax = plt.subplots(figsize=(12, 6))
-        for i, (label, group) in enumerate(agg_results.items()):
-            values = group.reindex(categories)[metric].values
+        ax.cla()
+        for i, (label, group) in enumerate(agg_aligned.items()):
+            values = group[metric].to_numpy()
             ax.bar(x + (i - (num_exps-1)/2)*width, values, width, label=label)
         ax.set_xticks(x)
         ax.set_xticklabels(categories, rotation=20, ha="right",
@@ -160,9 +176,8 @@ def plot_category_stats(experiments):
             ax.set_yticks(yticks)
         ax.legend()
         ax.yaxis.grid(True, linestyle="--", linewidth=0.8, color="gray", alpha=0.7)
-        plt.tight_layout()
-        plt.savefig(os.path.join(SAVE_DIR, file_name), dpi=300)
-        plt.close(fig)
+        fig.tight_layout()
+        fig.savefig(os.path.join(SAVE_DIR, file_name), dpi=300)
     
     plot_metric("avg_tool_calls",
                 "Average Tool Calls",
@@ -186,34 +201,32 @@ def plot_category_stats(experiments):
                 "Average Total Cost",
                 "Average Total Cost per Category",
                 "category_total_cost.png")
+    plt.close(fig)
+
+def load_tool_calls(raw):
+    """Decode one JSON-encoded tool_calls cell, treating malformed values as no calls."""
+    try:
+        return json.loads(raw)
+    except Exception:
+        return []
 
 def parse_tool_calls(df):
     """
     Parse the "tool_calls" column for each row in the DataFrame.
-    Returns a new DataFrame with columns: category and a dictionary mapping tool names to counts.
+    Returns a new DataFrame with columns: category and a Counter mapping tool names to counts.
     Assumes each row's tool_calls is a JSON-encoded array of dictionaries containing a "tool" key.
     If the column does not exist, returns None.
     """
     if "tool_calls" not in df.columns:
         return None
-    
-    records = []
-    for _, row in df.iterrows():
-        cat = row["category"]
-        tool_counter = {}
-        try:
-            calls = json.loads(row["tool_calls"])
-        except Exception:
-            calls = []
-        for call in calls:
-            tool = call.get("tool", "Unknown")
-            tool_counter[tool] = tool_counter.get(tool, 0) + 1
-        records.append({"category": cat, "tool_counter": tool_counter})
-    return pd.DataFrame(records)
-
-def plot_stacked_tool_calls_by_category(experiments):
+
+    calls = df["tool_calls"].fillna("[]").map(load_tool_calls)
+    tool_counters = calls.map(lambda row_calls: Counter(c.get("tool", "Unknown") for c in row_calls))
+    return pd.DataFrame({"category": df["category"].values, "tool_counter": tool_counters.values})
+
+def plot_stacked_tool_calls_by_category(experiments, parsed_cache):
     """
-    For each experiment that has a "tool_calls" column,
+    For each experiment that has a "tool_calls" column (parsed once into `parsed_cache`),
     create a subplot with a stacked bar chart (categories on the x-axis)
     and segments representing average counts of each tool (averaged per row within that category).
     """
@@ -221,46 +234,34 @@ def plot_stacked_tool_calls_by_category(experiments):
     num_exps = len(experiments)
     # Determine subplot layout: one row per experiment.
     fig, axes = plt.subplots(num_exps, 1, figsize=(12, 6*num_exps), squeeze=False)
-    
-    for idx, (label, df) in enumerate(experiments.items()):
-        parsed = parse_tool_calls(df)
+
+    # One sorted tool list and palette for all subplots, so a tool keeps its color.
+    global_tools = sorted({tool
+                           for parsed in parsed_cache.values() if parsed is not None
+                           for counter in parsed["tool_counter"]
+                           for tool in counter})
+    palette = dict(zip(global_tools, sns.color_palette("husl", n_colors=len(global_tools))))
+
+    for idx, label in enumerate(experiments):
+        parsed = parsed_cache[label]
         if parsed is None:
             print(f"Experiment {label} has no 'tool_calls' column. Skipping stacked plot.")
             continue
         
-        # Group by category. For each category, average counts per row.
-        d = {cat: {} for cat in desired_categories}
-        for _, row in parsed.iterrows():
-            cat = row["category"]
-            if cat not in desired_categories:
-                continue
-            # Add counts from this row.
-            for tool, cnt in row["tool_counter"].items():
-                d[cat][tool] = d[cat].get(tool, 0) + cnt
-        # Count how many rows per category:
-        count_per_cat = parsed.groupby("category").size().reindex(desired_categories).fillna(0)
-        
-        # Create DataFrame for plotting: rows=categories, columns=tools, values=average count.
-        plot_data = {}
-        all_tools = set()
-        for cat in desired_categories:
-            all_tools.update(d[cat].keys())
-        for tool in all_tools:
-            avg_counts = []
-            for cat in desired_categories:
-                total = d[cat].get(tool, 0)
-                n = count_per_cat.get(cat, 0)
-                avg = total / n if n > 0 else 0
-                avg_counts.append(avg)
-            plot_data[tool] = avg_counts
-        plot_df = pd.DataFrame(plot_data, index=desired_categories)
-        
+        # Rows=question, columns=tool; averaging per category gives the per-row mean count.
+        tool_counts = pd.DataFrame(parsed["tool_counter"].tolist(), index=parsed.index).fillna(0)
+        plot_df = (tool_counts.groupby(parsed["category"]).mean()
+                   .reindex(desired_categories).fillna(0))
+        # Keep only tools that were called within the plotted categories.
+        plot_df = plot_df.loc[:, (plot_df > 0).any()]
+
         ax = axes[idx][0]
         bottom = np.zeros(len(desired_categories))
-        colors = sns.color_palette("husl", n_colors=len(plot_df.columns))
-        for i, tool in enumerate(plot_df.columns):
+        for tool in global_tools:
+            if tool not in plot_df.columns:
+                continue
             ax.bar(desired_categories, plot_df[tool], bottom=bottom,
-                   label=tool, color=colors[i])
+                   label=tool, color=palette[tool])
             bottom += plot_df[tool].values
         ax.set_xlabel("Category", fontsize=12)
         ax.set_ylabel("Average Tool Call Count", fontsize=12)
@@ -270,15 +271,15 @@ def plot_stacked_tool_calls_by_category(experiments):
     plt.savefig(os.path.join(SAVE_DIR, "stacked_tool_calls_by_category.png"), dpi=300)
     plt.close(fig)
 
-def plot_overall_tool_call_frequency(experiments):
+def plot_overall_tool_call_frequency(experiments, parsed_cache):
     """
-    For each experiment with a "tool_calls" column, aggregate overall tool counts (ignoring category)
+    For each experiment with a "tool_calls" column (parsed once into `parsed_cache`), aggregate overall tool counts (ignoring category)
     and then plot a grouped bar chart where each experiment has bars for each tool.
     """
     overall_freq = {}
     all_tools = set()
-    for label, df in experiments.items():
-        parsed = parse_tool_calls(df)
+    for label in experiments:
+        parsed = parsed_cache[label]
         if parsed is None:
             continue
         counter = {}
@@ -321,6 +322,8 @@ def plot_overall_tool_call_frequency(experiments):
     plt.close(fig)
 
 def main(config, dataset_name="", drop_unrelated=True):
+    # Use a clean, professional style; applied here so importing the module has no side effects.
+    sns.set_theme(style="whitegrid")
     ensure_save_dir(SAVE_DIR)
     experiments = {}
     for key, value in config.items():
@@ -337,11 +340,14 @@ def main(config, dataset_name="", drop_unrelated=True):
         for key in experiments:
             experiments[key] = experiments[key].head(top_k)
     
+    # Decode each experiment's tool_calls once; both tool plots share the result.
+    parsed_cache = {label: parse_tool_calls(df) for label, df in experiments.items()}
+
     # Generate plots.
     plot_question_tool_calls(experiments)
     plot_category_stats(experiments)
-    plot_stacked_tool_calls_by_category(experiments)
-    plot_overall_tool_call_frequency(experiments)
+    plot_stacked_tool_calls_by_category(experiments, parsed_cache)
+    plot_overall_tool_call_frequency(experiments, parsed_cache)
     plot_category_stats_box(experiments, dataset_name)
     plot_metrics_subplots(experiments, dataset_name)
     print("All plots have been generated and saved in the 'plots' folder.")
@@ -482,6 +488,9 @@ def plot_category_stats_box(experiments, dataset_name):
         ("latency_seconds", "Latency (seconds)", "Latency per Category", "box_category_latency.png"),
     ]
 
+    # 16:9 figure, slide-friendly size; reused for every metric
+    fig, ax = plt.subplots(figsize=(16, 9))
+
     for metric, ylabel, title, file_name in metrics:
         # Combine all experiments into one DataFrame with experiment label
         combined = []
@@ -498,9 +507,8 @@ def plot_category_stats_box(experiments, dataset_name):
 
         df_all = pd.concat(combined, ignore_index=True)
 
-        # 16:9 figure, slide-friendly size
-        fig, ax = plt.subplots(figsize=(16, 9))
-        
+        ax.cla()
+
         # Box plot
         sns.boxplot(
             data=df_all,
@@ -512,19 +520,19 @@ def plot_category_stats_box(experiments, dataset_name):
             linewidth=2,
             fliersize=6
         )
-        # Strip plot for individual points
-        sns.stripplot(
-            data=df_all,
-            x="category",
-            y=metric,
-            hue="experiment",
-            dodge=True,
-            ax=ax,
-            alpha=0.6,
-            linewidth=1,
-            size=8,
-            palette="Set2"
-        )
+        # Individual points: one scatter per experiment, dodged like the boxes
+        # (seaborn's default box width is 0.8, split evenly across experiments).
+        categories = list(pd.unique(df_all["category"]))
+        exp_labels = list(pd.unique(df_all["experiment"]))
+        box_width = 0.8 / len(exp_labels)
+        cat_pos = df_all["category"].map({c: i for i, c in enumerate(categories)}).to_numpy()
+        jitter = np.random.default_rng(0).uniform(-0.4, 0.4, len(df_all)) * box_width
+        palette = sns.color_palette("Set2", n_colors=len(exp_labels))
+        for j, label in enumerate(exp_labels):
+            mask = (df_all["experiment"] == label).to_numpy()
+            offset = (j - (len(exp_labels) - 1) / 2) * box_width
+            ax.scatter(cat_pos[mask] + offset + jitter[mask], df_all[metric].to_numpy()[mask],
+                       color=palette[j], s=64, alpha=0.6, linewidths=1, edgecolors="gray")
 
         # Limit y-axis to 95th percentile for readability
         upper = df_all[metric].quantile(0.95)
@@ -546,14 +554,12 @@ def plot_category_stats_box(experiments, dataset_name):
         ax.yaxis.set_major_formatter(FuncFormatter(human_format))
 
 
-        # Clean legend: remove duplicates from stripplot
-        handles, labels = ax.get_legend_handles_labels()
-        ax.legend(handles[:len(experiments)], labels[:len(experiments)], title=None,
-                  fontsize=16, title_fontsize=18, loc='upper right')
+        # Only the boxes carry labels, so the legend needs no de-duplication
+        ax.legend(title=None, fontsize=16, title_fontsize=18, loc='upper right')
 
-        plt.tight_layout(pad=3)
-        plt.savefig(os.path.join(SAVE_DIR, file_name), dpi=300)
-        plt.close(fig)
+        fig.tight_layout(pad=3)
+        fig.savefig(os.path.join(SAVE_DIR, file_name), dpi=300)
+    plt.close(fig)
 
 
 
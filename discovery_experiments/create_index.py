@@ -5,7 +5,9 @@ embed_gql_fields.py
 Reads a GraphQL SDL file (benchmark.txt), flattens every type->field
 combination into a text snippet with all available metadata, sends
 those snippets to OpenAI embeddings (openai>=1.0.0 interface), and
-saves a JSONL with id/metadata/embedding for vector indexing.
+saves a JSONL with id/metadata plus an L2-normalized embedding matrix
+sidecar (<out>.npy, row "emb_idx" of each line) for vector indexing.
+Embeddings are written to the sidecar as each batch completes.
 
 Output format (one JSON object per line):
 {
@@ -13,15 +15,21 @@ Output format (one JSON object per line):
   "name": "Type.field",
   "kind": "TypeField",
   "metadata": { ... },
-  "embedding": [...]
+  "emb_idx": 0
 }
 """
 
 import os
-import json
 import time
+import asyncio
+import hashlib
+import pickle
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import orjson
 from dotenv import load_dotenv
 load_dotenv()
 from graphql import parse, print_ast, TypeInfo, visit
@@ -36,7 +44,7 @@ from graphql.language.ast import (
     InputValueDefinitionNode,
     NamedTypeNode,
 )
-from openai import OpenAI
+from openai import APIConnectionError, AsyncOpenAI, InternalServerError, RateLimitError
 
 # ----------------------------
 # Helpers for GraphQL TypeNode -> readable string
@@ -45,14 +53,26 @@ def type_node_to_str(node) -> str:
     """Return human readable GraphQL type string (e.g. [String!]!)."""
     if node is None:
         return "Unknown"
-    k = node.kind
-    if k == "named_type":
-        return node.name.value
-    if k == "non_null_type":
-        return f"{type_node_to_str(node.type)}!"
-    if k == "list_type":
-        return f"[{type_node_to_str(node.type)}]"
-    return str(node)
+    # Unwrap iteratively: "[" opens on the way in, "!"/"]" close in reverse order.
+    prefix, suffix = [], []
+    while True:
+        k = node.kind
+        if k == "named_type":
+            return "".join(prefix) + node.name.value + "".join(reversed(suffix))
+        if k == "non_null_type":
+            suffix.append("!")
+        elif k == "list_type":
+            prefix.append("[")
+            suffix.append("]")
+        else:
+            return str(node)
+        node = node.type
+
+def get_named_type_name(node) -> Optional[str]:
+    """Return the innermost named type of a wrapped TypeNode (e.g. [String!]! -> String)."""
+    while node is not None and node.kind != "named_type":
+        node = getattr(node, "type", None)
+    return node.name.value if node is not None else None
 
 def value_node_to_python(node):
     """Convert GraphQL ValueNode to Python literal (for defaults)."""
@@ -100,6 +120,37 @@ def parse_sdl_into_map(sdl_text: str) -> Tuple[Any, Dict[str, Any]]:
         }
     return ast, defs
 
+AST_CACHE_DIR = os.path.expanduser("~/.cache/graphql-mcp")
+
+def load_or_parse_sdl(sdl_text: str) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Same as parse_sdl_into_map, but reuses a pickled result keyed by the
+    sha256 of the SDL text so repeated runs on an unchanged schema skip parsing.
+    """
+    key = hashlib.sha256(sdl_text.encode("utf-8")).hexdigest()
+    cache_path = os.path.join(AST_CACHE_DIR, f"{key}.pkl")
+    try:
+        with open(cache_path, "rb") as fh:
+            return pickle.load(fh)
+    except Exception:
+        # missing, truncated, or pickled by another graphql-core version: reparse
+        pass
+    parsed = parse_sdl_into_map(sdl_text)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(AST_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "wb") as fh:
+            pickle.dump(parsed, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        # publish atomically so an interrupted write never leaves a truncated cache
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        # caching is best effort
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return parsed
+
 # ----------------------------
 # Extract interfaces implemented by object types
 # ----------------------------
@@ -111,7 +162,8 @@ def get_interfaces_of_type(node) -> List[str]:
 # ----------------------------
 # Create flattened text document for type->field
 # ----------------------------
-def build_type_field_doc(type_name: str, type_def: Any, field: Any, defs_map: Dict[str, Any]) -> Dict[str, Any]:
+def build_type_field_doc(type_name: str, type_def: Any, field: Any, defs_map: Dict[str, Any],
+                         sdl_snippet: str = "", type_interfaces: Optional[List[str]] = None) -> Dict[str, Any]:
     """
     Return dict:
     {
@@ -121,13 +173,14 @@ def build_type_field_doc(type_name: str, type_def: Any, field: Any, defs_map: Di
       metadata: {...},
       text: "the flattened text to embed"
     }
+    `sdl_snippet` and `type_interfaces` are per-type values computed once by the caller.
     """
     field_name = field.name.value
     field_type_str = type_node_to_str(field.type)
     type_kind = type_def["kind"]
     type_node = type_def["node"]
     type_desc = type_def.get("description")
-    type_interfaces = get_interfaces_of_type(type_node) if hasattr(type_node, "interfaces") else []
+    type_interfaces = type_interfaces or []
     # field description & args
     field_desc = getattr(field, "description", None)
     field_desc_val = field_desc.value if field_desc else None
@@ -143,16 +196,7 @@ def build_type_field_doc(type_name: str, type_def: Any, field: Any, defs_map: Di
                 "description": a.description.value if getattr(a, "description", None) else None,
             })
     # if the field type is named, fetch referenced type info (enums, inputs, objects)
-    named_type_name = None
-    # dig to the named type
-    def _named(node):
-        if node.kind == "named_type":
-            return node.name.value
-        return _named(node.type)
-    try:
-        named_type_name = _named(field.type)
-    except Exception:
-        named_type_name = None
+    named_type_name = get_named_type_name(field.type)
 
     referenced = {}
     if named_type_name and named_type_name in defs_map:
@@ -188,10 +232,10 @@ def build_type_field_doc(type_name: str, type_def: Any, field: Any, defs_map: Di
         "field_args": args_list,
         "referenced_type": named_type_name,
         "referenced": referenced,
-        "sdl_snippet": (print_ast(type_node)[:4000] if type_node is not None else ""),
+        "sdl_snippet": sdl_snippet,
     }
 
-    # Build flattened text (concise, includes metadata and small SDL snippets)
+    # Build flattened text (concise summary of the metadata)
     lines: List[str] = []
     lines.append(f"{type_name} -> {field_name}")
     if type_desc:
@@ -219,11 +263,8 @@ def build_type_field_doc(type_name: str, type_def: Any, field: Any, defs_map: Di
             lines.append("Referenced fields: " + sample)
         if "unionMembers" in referenced:
             lines.append("Union members: " + ", ".join(referenced["unionMembers"]))
-    # SDL provenance snippet
-    snippet = metadata["sdl_snippet"]
-    if snippet:
-        lines.append("SDL snippet:")
-        lines.append(snippet)
+    # The SDL snippet stays in metadata only: the lines above already cover its fields,
+    # and embedding it would multiply the tokens sent per doc.
     text = "\n".join(lines)
 
     return {
@@ -237,84 +278,219 @@ def build_type_field_doc(type_name: str, type_def: Any, field: Any, defs_map: Di
 # ----------------------------
 # Generate docs for all type->field combos (including inputs)
 # ----------------------------
-def generate_all_type_field_docs(defs_map: Dict[str, Any]) -> List[Dict[str, Any]]:
+def build_docs_for_type(name: str, defn: Dict[str, Any], defs_map: Dict[str, Any]) -> List[Dict[str, Any]]:
     docs = []
-    for name, defn in defs_map.items():
-        kind = defn["kind"]
-        node = defn["node"]
-        # handle object types, interfaces, input objects
-        if kind in ("object_type_definition", "interface_type_definition"):
-            fields = getattr(node, "fields", None) or []
-            for f in fields:
-                docs.append(build_type_field_doc(name, defn, f, defs_map))
-        elif kind == "input_object_type_definition":
-            # input fields are also InputValueDefinitionNode list under "fields"
-            fields = getattr(node, "fields", None) or []
-            for f in fields:
-                # adapt InputValueDefinitionNode to same builder
-                # create a fake FieldDefinitionNode-like wrapper
-                fake_field = f  # InputValueDefinitionNode has name, type, description
-                docs.append(build_type_field_doc(name, defn, fake_field, defs_map))
-        else:
-            # For enums/scalars/unions we don't create type->field embeddings because
-            # there's no field. Optionally create Type->__type entries if desired.
-            pass
-
+    kind = defn["kind"]
+    node = defn["node"]
+    # per-type values shared by every field doc of this type
+    snippet = defn["raw"][:4000]
+    interfaces = get_interfaces_of_type(node)
+    # handle object types, interfaces, input objects
+    if kind in ("object_type_definition", "interface_type_definition"):
+        fields = getattr(node, "fields", None) or []
+        for f in fields:
+            docs.append(build_type_field_doc(name, defn, f, defs_map, snippet, interfaces))
+    elif kind == "input_object_type_definition":
+        # input fields are also InputValueDefinitionNode list under "fields"
+        fields = getattr(node, "fields", None) or []
+        for f in fields:
+            # adapt InputValueDefinitionNode to same builder
+            # create a fake FieldDefinitionNode-like wrapper
+            fake_field = f  # InputValueDefinitionNode has name, type, description
+            docs.append(build_type_field_doc(name, defn, fake_field, defs_map, snippet, interfaces))
+    else:
+        # For enums/scalars/unions we don't create type->field embeddings because
+        # there's no field. Optionally create Type->__type entries if desired.
+        pass
     return docs
 
+# Worker-process copy of defs_map, sent once per worker by the pool initializer.
+_WORKER_DEFS_MAP: Dict[str, Any] = {}
+
+def _init_worker(defs_map: Dict[str, Any]):
+    global _WORKER_DEFS_MAP
+    _WORKER_DEFS_MAP = defs_map
+
+def _build_docs_in_worker(name: str) -> List[Dict[str, Any]]:
+    return build_docs_for_type(name, _WORKER_DEFS_MAP[name], _WORKER_DEFS_MAP)
+
+# Below this many definitions, process start-up costs more than it saves.
+PARALLEL_MIN_DEFS = 500
+
+def generate_all_type_field_docs(defs_map: Dict[str, Any], max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Build docs for every type, in definition order. Large schemas are split per type
+    across a process pool of `max_workers` (default: os.cpu_count()); pass 1 to stay serial.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    if workers <= 1 or len(defs_map) < PARALLEL_MIN_DEFS:
+        docs = []
+        for name, defn in defs_map.items():
+            docs.extend(build_docs_for_type(name, defn, defs_map))
+        return docs
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(defs_map,)) as executor:
+        per_type = executor.map(_build_docs_in_worker, defs_map.keys(), chunksize=16)
+        return [doc for docs in per_type for doc in docs]
+
 # ----------------------------
 # Batch embeddings using OpenAI >=1.0.0 client
 # ----------------------------
-def batch_iter(iterable, n):
-    batch = []
-    for item in iterable:
-        batch.append(item)
-        if len(batch) >= n:
-            yield batch
-            batch = []
-    if batch:
-        yield batch
-
-def embed_documents(docs: List[Dict[str, Any]],
-                    model: str = "text-embedding-3-small",
-                    batch_size: int = 64,
-                    sleep_between: float = 0.6) -> List[Dict[str, Any]]:
+def batch_iter(seq, n):
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+# ----------------------------
+# Rate limiting and retries for embedding calls
+# ----------------------------
+@dataclass
+class RateLimitConfig:
+    """Requests-per-minute budget and retry policy (defaults: tier-1 limits; use 500 rpm on the free tier)."""
+    max_rpm: int = 3500
+    max_retries: int = 6
+    base_delay: float = 1.0
+
+class RequestRateLimiter:
+    """Token bucket allowing `max_rpm` requests per rolling minute."""
+    def __init__(self, max_rpm: int):
+        self.capacity = float(max_rpm)
+        self.rate = max_rpm / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# 429s, 5xx responses, and connection failures/timeouts (APITimeoutError is an APIConnectionError)
+RETRYABLE_ERRORS = (RateLimitError, InternalServerError, APIConnectionError)
+
+async def _call_with_backoff(fn, limiter: RequestRateLimiter, config: RateLimitConfig, *args, **kwargs):
+    """Call `fn` under the limiter, retrying transient errors with exponential backoff that honors Retry-After."""
+    for attempt in range(config.max_retries + 1):
+        await limiter.acquire()
+        try:
+            return await fn(*args, **kwargs)
+        except RETRYABLE_ERRORS as e:
+            if attempt == config.max_retries:
+                raise
+            delay = config.base_delay * 2 ** attempt
+            response = getattr(e, "response", None)
+            retry_after = response.headers.get("retry-after") if response is not None else None
+            try:
+                delay = max(delay, float(retry_after))
+            except (TypeError, ValueError):
+                pass
+            await asyncio.sleep(delay)
+
+async def _embed_batch(client: AsyncOpenAI, sem: asyncio.Semaphore, limiter: RequestRateLimiter,
+                       config: RateLimitConfig, batch: List[str], model: str):
+    async with sem:
+        resp = await _call_with_backoff(client.embeddings.create, limiter, config,
+                                        model=model, input=batch)
+    # resp.data is list of objects with .embedding
+    return resp.data
+
+async def _embed_all(batches: List[List[str]], api_key: str, model: str, max_inflight: int,
+                     config: RateLimitConfig, on_batch):
+    sem = asyncio.Semaphore(max_inflight)
+    limiter = RequestRateLimiter(config.max_rpm)
+
+    async def run(batch_index: int, batch: List[str]):
+        # on_batch runs on the event loop thread, so writes from it never interleave
+        on_batch(batch_index, await _embed_batch(client, sem, limiter, config, batch, model))
+
+    # Retries are handled by _call_with_backoff, so the client's own retry loop is disabled.
+    async with AsyncOpenAI(api_key=api_key, max_retries=0) as client:
+        await asyncio.gather(*(run(i, b) for i, b in enumerate(batches)))
+
+def embed_and_save(docs: List[Dict[str, Any]],
+                   out_path: str,
+                   model: str = "text-embedding-3-small",
+                   batch_size: int = 64,
+                   max_inflight: int = 8,
+                   rate_limit: Optional[RateLimitConfig] = None) -> int:
     """
-    Uses openai.OpenAI client (>=1.0.0).
-    Returns input docs augmented with 'embedding' vector.
+    Uses openai.AsyncOpenAI client (>=1.0.0), with up to `max_inflight` batches in flight
+    and request rate/retries governed by `rate_limit`.
+    The JSONL metadata is written up front; each batch is L2-normalized into the
+    memory-mapped float16 sidecar `out_path`.npy as soon as it completes, so the
+    embeddings are never all held in memory. Both files only replace `out_path`
+    and its sidecar once every batch has succeeded.
+    Returns the number of embedded rows.
     """
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("Please set OPENAI_API_KEY environment variable.")
 
-    client = OpenAI(api_key=api_key)
-    out = []
-    for batch in batch_iter(docs, batch_size):
-        inputs = [d["text"] for d in batch]
-        resp = client.embeddings.create(model=model, input=inputs)
+    # Both outputs are written under temporary names and only moved into place once
+    # every batch has been embedded, so a failed run never leaves a JSONL next to a
+    # zero-filled or partial sidecar.
+    jsonl_tmp = out_path + ".tmp"
+    sidecar_path = out_path + ".npy"
+    sidecar_tmp = sidecar_path + ".tmp"
+    save_jsonl(docs, jsonl_tmp)
+
+    sidecar = None
+
+    def write_batch(batch_index: int, data):
+        nonlocal sidecar
         # resp.data is list of objects with .embedding
-        for doc, emb_obj in zip(batch, resp.data):
-            emb = emb_obj.embedding
-            doc_copy = dict(doc)
-            doc_copy["embedding"] = emb
-            out.append(doc_copy)
-        time.sleep(sleep_between)
-    return out
+        emb = np.asarray([e.embedding for e in data], dtype=np.float32)
+        if sidecar is None:
+            # the embedding width is only known once the first batch arrives
+            sidecar = np.lib.format.open_memmap(sidecar_tmp, mode="w+", dtype=np.float16,
+                                                shape=(len(docs), emb.shape[1]))
+        norms = np.linalg.norm(emb, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        start = batch_index * batch_size
+        sidecar[start:start + len(emb)] = emb / norms
+
+    batches = list(batch_iter([d["text"] for d in docs], batch_size))
+    try:
+        asyncio.run(_embed_all(batches, api_key, model, max_inflight, rate_limit or RateLimitConfig(), write_batch))
+        if sidecar is None:
+            # no documents: still emit an (empty) sidecar so the pair stays consistent
+            with open(sidecar_tmp, "wb") as fh:
+                np.save(fh, np.empty((0, 0), dtype=np.float16))
+        else:
+            sidecar.flush()
+            del sidecar
+        os.replace(sidecar_tmp, sidecar_path)
+        os.replace(jsonl_tmp, out_path)
+    except BaseException:
+        sidecar = None
+        for tmp in (jsonl_tmp, sidecar_tmp):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        raise
+    return len(docs)
 
 # ----------------------------
 # Save JSONL
 # ----------------------------
 def save_jsonl(out_docs: List[Dict[str, Any]], out_path: str):
-    with open(out_path, "w", encoding="utf-8") as fh:
-        for d in out_docs:
+    """Write doc metadata to `out_path`; line i uses row i (its emb_idx) of the `out_path`.npy sidecar."""
+    with open(out_path, "wb") as fh:
+        for row, d in enumerate(out_docs):
             tosave = {
                 "id": d["id"],
                 "name": d["name"],
                 "kind": d["kind"],
                 "metadata": d["metadata"],
-                "embedding": d["embedding"],
+                "emb_idx": row,
             }
-            fh.write(json.dumps(tosave) + "\n")
+            fh.write(orjson.dumps(tosave) + b"\n")
 
 # ----------------------------
 # CLI
@@ -325,18 +501,20 @@ def main():
     parser.add_argument("--out", "-o", required=True, help="Output JSONL file path")
     parser.add_argument("--model", default="text-embedding-3-small", help="Embedding model")
     parser.add_argument("--batch", type=int, default=64, help="Batch size for embedding requests")
-    parser.add_argument("--sleep", type=float, default=0.6, help="Seconds to sleep between batches")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for building docs on large schemas (default: all cores)")
+    parser.add_argument("--max-inflight", type=int, default=8, help="Maximum concurrent embedding requests")
+    parser.add_argument("--max-rpm", type=int, default=3500, help="Embedding requests per minute (3500 for tier 1, 500 for free tier)")
     args = parser.parse_args()
 
     with open(args.input, "r", encoding="utf-8") as fh:
         sdl = fh.read()
 
     print("Parsing SDL...")
-    ast, defs_map = parse_sdl_into_map(sdl)
+    ast, defs_map = load_or_parse_sdl(sdl)
     print(f"Parsed {len(defs_map)} named definitions.")
 
     print("Generating type->field documents...")
-    docs = generate_all_type_field_docs(defs_map)
+    docs = generate_all_type_field_docs(defs_map, max_workers=args.workers)
     print(f"Created {len(docs)} type->field docs to embed.")
 
     if len(docs) == 0:
@@ -345,12 +523,10 @@ def main():
 
     # Optional: you might want to prioritize certain kinds (object > interface > input).
     # For now we keep given order.
-    print("Creating embeddings (OpenAI)...")
-    docs_with_embeddings = embed_documents(docs, model=args.model, batch_size=args.batch, sleep_between=args.sleep)
-    print(f"Received embeddings for {len(docs_with_embeddings)} docs.")
-
-    print(f"Saving to {args.out} ...")
-    save_jsonl(docs_with_embeddings, args.out)
+    print(f"Creating embeddings (OpenAI), saving to {args.out} ...")
+    rows = embed_and_save(docs, args.out, model=args.model, batch_size=args.batch, max_inflight=args.max_inflight,
+                          rate_limit=RateLimitConfig(max_rpm=args.max_rpm))
+    print(f"Saved embeddings for {len(docs)} docs ({rows} unique texts).")
     print("Done.")
 
 if __name__ == "__main__":
@@ -4,37 +4,56 @@ Usage:
   python3 query.py --query "what are the best hotels?" --embeddings test
 
 Notes:
- - Requires: pip install openai numpy
+ - Requires: pip install openai numpy orjson
  - Set OPENAI_API_KEY environment variable.
- - Expects embeddings JSONL where each line contains {"id","name","metadata","embedding","text"?}
+ - Expects embeddings JSONL where each line contains {"id","name","metadata","text"?}, with the
+   normalized embedding matrix in a <embeddings>.npy sidecar (as written by create_index.py).
+   Older indexes that store an "embedding" field per line are still accepted.
 """
 
 import os
 import json
+import hashlib
 import argparse
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
+from collections import defaultdict, deque
 import numpy as np
+import orjson
 from openai import OpenAI
 
 # ----------------------------
 # Loading embeddings
 # ----------------------------
 def load_jsonl_embeddings(path: str) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """
+    Return (docs, corpus) where corpus is the L2-normalized (N, D) embedding matrix.
+    The <path>.npy sidecar is memory-mapped when present (row i belongs to line i);
+    otherwise embeddings are read from each JSONL line and normalized here.
+    """
+    sidecar = path + ".npy"
+    has_sidecar = os.path.exists(sidecar)
     docs = []
     embeddings = []
-    with open(path, "r", encoding="utf-8") as fh:
+    with open(path, "rb") as fh:
         for line in fh:
             line = line.strip()
             if not line:
                 continue
-            obj = json.loads(line)
-            if "embedding" not in obj:
-                raise ValueError("Each JSONL line must contain an 'embedding' field.")
+            obj = orjson.loads(line)
+            if not has_sidecar:
+                if "embedding" not in obj:
+                    raise ValueError("Each JSONL line must contain an 'embedding' field.")
+                embeddings.append(obj.pop("embedding"))
             docs.append(obj)
-            embeddings.append(obj["embedding"])
-    emb_array = np.array(embeddings, dtype=np.float32)
+    if has_sidecar:
+        emb_array = np.load(sidecar, mmap_mode="r")
+    else:
+        # float16 halves the bytes streamed per similarity pass; scores are computed in float32
+        emb_array = normalize_rows(np.asarray(embeddings, dtype=np.float32)).astype(np.float16)
     if emb_array.ndim != 2:
         raise ValueError("Embeddings must be a 2D array (N, D).")
+    if emb_array.shape[0] != len(docs):
+        raise ValueError("Embedding rows do not match the number of JSONL docs.")
     return docs, emb_array
 
 def constrain_results_by_first_signature(results: List[Tuple[float, Dict[str, Any]]]) -> List[Tuple[float, Dict[str, Any]]]:
@@ -81,77 +100,164 @@ def constrain_results_recursively(results: List[Tuple[float, Dict[str, Any]]], t
     if not results:
         return []
 
+    n = len(results)
+    # Precompute, once: each result's bare field type (no !/[] wrappers) and, per
+    # type_name, the result indices ordered by score desc (ties keep input order).
+    child_type = [
+        (doc.get("metadata", {}).get("field_type") or "?").replace("!", "").replace("[", "").replace("]", "")
+        for _, doc in results
+    ]
+    by_type = defaultdict(list)
+    for j, (_, doc) in enumerate(results):
+        by_type[doc.get("metadata", {}).get("type_name")].append(j)
+    for indices in by_type.values():
+        indices.sort(key=lambda j: -results[j][0])
+
     selected = []
-    used = set()
+    used = bytearray(n)
+    in_queue = bytearray(n)
 
-    # This tracks indices (like a work queue for BFS, prioritized by score)
-    pending_roots = [i for i in range(len(results))]
-    while len(selected) < topk and pending_roots:
+    # Roots are taken in input (score) order; every index before `next_root` is used.
+    next_root = 0
+    while len(selected) < topk:
         # Find next unused, highest-score result as current cluster root
-        next_root = None
-        for i in pending_roots:
-            if i not in used:
-                next_root = i
-                break
-        if next_root is None:
+        while next_root < n and used[next_root]:
+            next_root += 1
+        if next_root == n:
             break  # all used
 
-        queue = [next_root]
-        pending_roots = [i for i in pending_roots if i != next_root]
+        queue = deque([next_root])
+        in_queue[next_root] = 1
 
         while queue and len(selected) < topk:
-            idx = queue.pop(0)
-            if idx in used:
+            idx = queue.popleft()
+            in_queue[idx] = 0
+            if used[idx]:
                 continue
-            score, doc = results[idx]
-            selected.append((score, doc))
-            used.add(idx)
-
-            meta = doc.get("metadata", {})
-            field_type = (meta.get("field_type") or "?").replace("!", "").replace("[", "").replace("]", "")
-
-            # Find all unused children with matching type_name, sort by score desc
-            children = [
-                (j, results[j][0])
-                for j in range(len(results))
-                if j not in used
-                and results[j][1].get("metadata", {}).get("type_name") == field_type
-                and j not in queue
-            ]
-            children.sort(key=lambda x: -x[1])
-            child_indices_sorted = [j for j, _ in children]
+            selected.append(results[idx])
+            used[idx] = 1
+
+            # All unused children with matching type_name, already sorted by score desc
+            children = [j for j in by_type.get(child_type[idx], ()) if not used[j] and not in_queue[j]]
+            for j in children:
+                in_queue[j] = 1
             # Add high-score children to the FRONT for high-score-first expansion
-            queue = child_indices_sorted + queue
+            queue.extendleft(reversed(children))
 
     return selected[:topk]
 
 # ----------------------------
 # Vector helpers
 # ----------------------------
+SIM_TILE_ROWS = 4096
+
 def normalize_rows(a: np.ndarray) -> np.ndarray:
-    norms = np.linalg.norm(a, axis=1, keepdims=True)
+    """L2-normalize rows, computing in float32 and keeping the input dtype."""
+    norms = np.linalg.norm(a.astype(np.float32), axis=1, keepdims=True)
     norms[norms == 0] = 1.0
-    return a / norms
+    return (a / norms).astype(a.dtype, copy=False)
 
 def cosine_similarity_matrix(query_vec: np.ndarray, corpus_normed: np.ndarray) -> np.ndarray:
     """
     Compute cosine similarity (dot products) between a single query vector and an L2-normalized corpus.
     - query_vec: shape (D,) or (1, D) (not necessarily normalized)
-    - corpus_normed: shape (N, D) and must be L2-normalized already
+    - corpus_normed: shape (N, D) and must be L2-normalized already (float16 or float32)
     Returns: sims shape (N,) (float32)
     """
     q = query_vec.reshape(-1).astype(np.float32)
     q_norm = q / (np.linalg.norm(q) or 1.0)
-    # Matrix multiply: (N, D) @ (D,) -> (N,)
-    sims = corpus_normed @ q_norm
+    # Matrix multiply in row tiles: each (T, D) tile is upcast to float32 for BLAS, so the
+    # full corpus is never materialized as float32.
+    N = corpus_normed.shape[0]
+    sims = np.empty(N, dtype=np.float32)
+    for start in range(0, N, SIM_TILE_ROWS):
+        tile = corpus_normed[start:start + SIM_TILE_ROWS]
+        sims[start:start + SIM_TILE_ROWS] = tile.astype(np.float32, copy=False) @ q_norm
     return sims  # shape (N,)
 
+# ----------------------------
+# Approximate nearest neighbours (optional, large corpora only)
+# ----------------------------
+ANN_THRESHOLD = 50_000       # exact scan below this many docs
+ANN_CANDIDATE_FACTOR = 5     # over-fetch so constrain_results_recursively has room to expand
+
+def load_or_build_ann_index(path: str, corpus_normed: np.ndarray):
+    """
+    Return a FAISS HNSW inner-product index over the normalized corpus (cosine similarity),
+    persisted next to the embeddings as <path>.faiss. The saved index is reused only while
+    <path>.faiss.json still matches the embeddings files' mtime and size. Returns None for corpora below
+    ANN_THRESHOLD or when faiss is not installed, in which case the exact scan is used.
+    """
+    if corpus_normed.shape[0] <= ANN_THRESHOLD:
+        return None
+    try:
+        import faiss
+    except ImportError:
+        return None
+    index_path = path + ".faiss"
+    meta_path = index_path + ".json"
+    fingerprint = _embeddings_fingerprint(path)
+    if os.path.exists(index_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as fh:
+                stored = json.load(fh)
+        except (OSError, ValueError):
+            stored = None
+        if stored == fingerprint:
+            index = faiss.read_index(index_path)
+            if index.ntotal == corpus_normed.shape[0]:
+                return index
+    index = faiss.IndexHNSWFlat(corpus_normed.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = 200
+    index.add(np.ascontiguousarray(corpus_normed, dtype=np.float32))
+    faiss.write_index(index, index_path)
+    with open(meta_path, "w", encoding="utf-8") as fh:
+        json.dump(fingerprint, fh)
+    return index
+
+def _embeddings_fingerprint(path: str) -> Dict[str, List[int]]:
+    """(mtime_ns, size) of the JSONL and its .npy sidecar, used to detect a stale saved index."""
+    fingerprint = {}
+    for p in (path, path + ".npy"):
+        if os.path.exists(p):
+            st = os.stat(p)
+            fingerprint[os.path.basename(p)] = [st.st_mtime_ns, st.st_size]
+    return fingerprint
+
 # ----------------------------
 # OpenAI embedding
 # ----------------------------
-def get_query_embedding(client: OpenAI, query: str, model: str) -> List[float]:
-    resp = client.embeddings.create(model=model, input=[query])
-    return resp.data[0].embedding
+QUERY_CACHE_DIR = os.path.expanduser("~/.cache/graphql-mcp/queries")
+
+def _query_cache_path(query: str, model: str) -> str:
+    key = hashlib.sha256(f"{model}\0{query}".encode("utf-8")).hexdigest()
+    return os.path.join(QUERY_CACHE_DIR, f"{key}.npy")
+
+def get_query_embeddings(client: OpenAI, queries: List[str], model: str) -> List[np.ndarray]:
+    """
+    Embed `queries`, reusing on-disk float32 copies keyed by sha256(model, query).
+    All queries missing from the cache are sent in a single embeddings request.
+    """
+    embs: List[Any] = [None] * len(queries)
+    missing = []
+    for i, query in enumerate(queries):
+        try:
+            embs[i] = np.load(_query_cache_path(query, model))
+        except (OSError, ValueError):
+            missing.append(i)
+    if missing:
+        resp = client.embeddings.create(model=model, input=[queries[i] for i in missing])
+        for i, emb_obj in zip(missing, resp.data):
+            embs[i] = np.asarray(emb_obj.embedding, dtype=np.float32)
+            try:
+                os.makedirs(QUERY_CACHE_DIR, exist_ok=True)
+                np.save(_query_cache_path(queries[i], model), embs[i])
+            except OSError:
+                pass  # caching is best effort
+    return embs
+
+def get_query_embedding(client: OpenAI, query: str, model: str) -> np.ndarray:
+    return get_query_embeddings(client, [query], model)[0]
 
 # ----------------------------
 # Retrieval (fast top-k)
@@ -161,27 +267,33 @@ def retrieve_top_k(query: str,
                    emb_array: np.ndarray,
                    client: OpenAI,
                    model: str = "text-embedding-3-small",
-                   topk: int = 10) -> List[Tuple[float, Dict[str, Any]]]:
+                   topk: int = 10,
+                   ann_index=None,
+                   query_embedding: Optional[np.ndarray] = None) -> List[Tuple[float, Dict[str, Any]]]:
     if emb_array.size == 0:
         return []
 
-    # Normalize corpus rows once
-    corpus_normed = normalize_rows(emb_array)
+    # Embed query (unless the caller already embedded it, e.g. as part of a batch)
+    q_emb = query_embedding if query_embedding is not None else get_query_embedding(client, query, model)
 
-    # Embed query
-    q_emb = np.array(get_query_embedding(client, query, model), dtype=np.float32)
+    if ann_index is not None:
+        q = q_emb.reshape(1, -1).astype(np.float32)
+        q /= (np.linalg.norm(q) or 1.0)
+        scores, ids = ann_index.search(q, min(topk, len(docs)))
+        return [(float(sc), docs[i]) for sc, i in zip(scores[0], ids[0]) if i >= 0]
 
-    # Similarities
-    sims = cosine_similarity_matrix(q_emb, corpus_normed)
+    # Similarities (corpus rows are L2-normalized at load time)
+    sims = cosine_similarity_matrix(q_emb, emb_array)
 
     N = sims.shape[0]
     k = min(topk, N)
     if k <= 0:
         return []
 
-    # fast top-k with argpartition, then sort those
-    idx_part = np.argpartition(-sims, range(k))[:k]
-    idx_sorted = idx_part[np.argsort(-sims[idx_part])]
+    # fast top-k: a single-pivot argpartition, then sort only the k selected
+    neg = -sims
+    idx_part = np.argpartition(neg, k - 1)[:k]
+    idx_sorted = idx_part[np.argsort(neg[idx_part])]
     results = [(float(sims[i]), docs[i]) for i in idx_sorted]
     return results
 
@@ -190,40 +302,31 @@ def retrieve_top_k(query: str,
 # ----------------------------
 def print_results_tree(results):
     """Pretty print results as a tree by id hierarchy (type->field->subfield)."""
-    # Build a dict tree: {root: {child: ...}}
-    from collections import defaultdict
-
-    def nested_dict():
-        return defaultdict(nested_dict)
-
-    tree = nested_dict()
+    # Flat adjacency built in one pass: parent path (tuple of id parts) -> ordered child names.
+    children = defaultdict(dict)
     node_scores = {}
-    node_types = {}
     node_signatures = {}
 
     for score, doc in results:
         id_path = str(doc["id"])
-        parts = id_path.split("->")
-        node = tree
-        for part in parts:
-            node = node[part]
-        node_scores[id_path] = score
+        parts = tuple(id_path.split("->"))
+        for depth in range(len(parts)):
+            children[parts[:depth]][parts[depth]] = None
+        node_scores[parts] = score
         meta = doc.get("metadata") or {}
-        node_types[id_path] = meta.get("type_name") or meta.get("type") or "?"
-        node_signatures[id_path] = meta.get("field_type") or "?"
-
-    # Recursively print
-    def print_node(node, path=[], level=0):
-        indent = "  " * level
-        for child, subnode in node.items():
-            full_path = "->".join(path + [child])
-            # Show score and signature if present
-            extra = ""
-            if full_path in node_scores:
-                extra = f" [score={node_scores[full_path]:.3f}, signature={node_signatures[full_path]}]"
-            print(f"{indent}{child}{extra}")
-            print_node(subnode, path + [child], level+1)
-    print_node(tree)
+        node_signatures[parts] = meta.get("field_type") or "?"
+
+    # Depth-first print with an explicit stack, children in first-seen order
+    stack = [(name,) for name in reversed(list(children[()]))]
+    while stack:
+        path = stack.pop()
+        indent = "  " * (len(path) - 1)
+        # Show score and signature if present
+        extra = ""
+        if path in node_scores:
+            extra = f" [score={node_scores[path]:.3f}, signature={node_signatures[path]}]"
+        print(f"{indent}{path[-1]}{extra}")
+        stack.extend(path + (name,) for name in reversed(list(children.get(path, ()))))
 
 def print_results(results: List[Tuple[float, Dict[str, Any]]], show_text_len: int = 800):
     for rank, (score, doc) in enumerate(results, start=1):
@@ -253,7 +356,7 @@ load_dotenv()
 def main():
     parser = argparse.ArgumentParser(description="Query type->field embeddings and retrieve top K relevant fields.")
     parser.add_argument("--embeddings", "-e", required=True, help="Path to embeddings JSONL (one object per line).")
-    parser.add_argument("--query", "-q", required=True, help="Natural language query.")
+    parser.add_argument("--query", "-q", required=True, nargs="+", help="Natural language query (several may be given; they are embedded in one request).")
     parser.add_argument("--model", "-m", default="text-embedding-3-small", help="Embedding model used for query (should match stored).")
     parser.add_argument("--topk", type=int, default=10, help="Number of top results to return.")
     parser.add_argument("--constrain-results", action=argparse.BooleanOptionalAction, default=True, help="Recursively constrain results based on breadth-first expansion")
@@ -266,34 +369,43 @@ def main():
 
     print(f"Loading embeddings from {args.embeddings} ...")
     docs, emb_array = load_jsonl_embeddings(args.embeddings)
+    ann_index = load_or_build_ann_index(args.embeddings, emb_array)
+
+    # Exact search ranks the whole corpus; ANN only fetches a candidate pool.
+    candidates = len(docs) if ann_index is None else args.topk * ANN_CANDIDATE_FACTOR
+    # Embed every query up front in one request, then rank each against the corpus.
+    query_embs = get_query_embeddings(client, args.query, args.model)
+    for query, q_emb in zip(args.query, query_embs):
+        if len(args.query) > 1:
+            print(f"=== Query: {query}")
+        results = retrieve_top_k(query, docs, emb_array, client, model=args.model, topk=candidates,
+                                 ann_index=ann_index, query_embedding=q_emb)
+        if args.constrain_results:
+            results = constrain_results_recursively(results, args.topk)
+        else:
+            results = results[:args.topk]
 
-    results = retrieve_top_k(args.query, docs, emb_array, client, model=args.model, topk=len(docs))
-    if args.constrain_results:
-        results = constrain_results_recursively(results, args.topk)
-    else:
         results = results[:args.topk]
-
-    results = results[:args.topk]
-    print("DONE")
-
-    if not results:
-        print("No results found.")
-        return
-
-    print_results(results)
-    print_results_tree(results)
-
-    # Print compact JSON output for programmatic use
-    out_compact = []
-    for score, doc in results:
-        out_compact.append({
-            "id": doc.get("id"),
-            "name": doc.get("name"),
-            "score": score,
-            "metadata": doc.get("metadata"),
-        })
-    #print("=== JSON output (top results) ===")
-    #print(json.dumps(out_compact, indent=2))
+        print("DONE")
+
+        if not results:
+            print("No results found.")
+            continue
+
+        print_results(results)
+        print_results_tree(results)
+
+        # Print compact JSON output for programmatic use
+        out_compact = []
+        for score, doc in results:
+            out_compact.append({
+                "id": doc.get("id"),
+                "name": doc.get("name"),
+                "score": score,
+                "metadata": doc.get("metadata"),
+            })
+        #print("=== JSON output (top results) ===")
+        #print(json.dumps(out_compact, indent=2))
 
 if __name__ == "__main__":
     main()
@@ -1,17 +1,24 @@
 import os
-import json
-from typing import List, Literal, Optional
+import asyncio
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import AsyncIterator, List, Literal, Optional
 
+import orjson
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request
-from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
-from langchain_openai import ChatOpenAI
-from langchain_community.callbacks import get_openai_callback
+from fastapi.responses import FileResponse, ORJSONResponse
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_community.callbacks.openai_info import OpenAICallbackHandler
+from langchain_core.callbacks import AsyncCallbackHandler
 from langchain.globals import set_llm_cache
 from pydantic import BaseModel
+from sse_starlette.sse import EventSourceResponse
 
 from mcp_use import MCPClient, MCPAgent
 
+from .llm_cache import LLMCache
+
 # ---------------------------------------------------------------------
 # Environment & Global Config
 # ---------------------------------------------------------------------
@@ -21,6 +28,26 @@ set_llm_cache(None)
 app = FastAPI()
 LLM_MODEL_NAME = "gpt-4.1"
 
+# Unset keeps the OpenAI default temperature
+LLM_TEMPERATURE = float(os.environ["LLM_TEMPERATURE"]) if os.getenv("LLM_TEMPERATURE") else None
+
+# Semantic answer cache; a hit replays a previous answer instead of sampling a new one,
+# so LLM_CACHE=true only takes effect for a deterministic LLM_TEMPERATURE=0.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "false").lower() == "true" and LLM_TEMPERATURE == 0
+LLM_CACHE_THRESHOLD = float(os.getenv("LLM_CACHE_THRESHOLD", "0.92"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+EMBEDDING_MODEL_NAME = "text-embedding-3-small"
+
+# SSE frames already queued are coalesced into one chunk of up to this size,
+# collected for at most SSE_FLUSH_INTERVAL seconds after the first frame.
+SSE_FLUSH_BYTES = 8 * 1024
+SSE_FLUSH_INTERVAL = 0.005
+SSE_END_FRAME = b"event: end\ndata: {}\n\n"
+# Seconds between keep-alive comments while the agent is busy with a long step
+SSE_PING_INTERVAL = 15
+# Pings must use the same "\n" framing as _sse(); the frontend splits events on "\n\n"
+SSE_SEP = "\n"
+
 # ---------------------------------------------------------------------
 # Pydantic Models
 # ---------------------------------------------------------------------
@@ -46,17 +73,141 @@ MCP_CONFIG = {
 }
 
 
+# ---------------------------------------------------------------------
+# Token Usage
+# ---------------------------------------------------------------------
+# Per-request usage totals; set in the task that drives the agent
+_request_usage: ContextVar[Optional[OpenAICallbackHandler]] = ContextVar("request_usage", default=None)
+
+
+class UsageHandler(AsyncCallbackHandler):
+    """Forward LLM usage to the current request's OpenAICallbackHandler, if any."""
+
+    async def on_llm_end(self, response, **kwargs) -> None:
+        usage = _request_usage.get()
+        if usage is not None:
+            usage.on_llm_end(response, **kwargs)
+
+
+USAGE_HANDLER = UsageHandler()
+
+
+def track_usage() -> OpenAICallbackHandler:
+    """Start counting tokens and cost for the LLM calls made from the current task."""
+    usage = OpenAICallbackHandler()
+    _request_usage.set(usage)
+    return usage
+
+
+def usage_metadata(usage: OpenAICallbackHandler) -> dict:
+    """Usage payload returned to clients at the end of a request."""
+    return {
+        "total_tokens": usage.total_tokens,
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_cost": usage.total_cost,
+    }
+
+
+@lru_cache(maxsize=4)
+def get_agent(streaming: bool) -> MCPAgent:
+    """
+    Return the shared agent for the given LLM streaming mode.
+
+    The agent keeps its MCP sessions open across requests and has memory
+    disabled, so each request passes its own history explicitly.
+    """
+    request_llm = ChatOpenAI(
+        model=LLM_MODEL_NAME,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        cache=False,
+        temperature=LLM_TEMPERATURE,
+        streaming=streaming,
+        stream_usage=streaming,
+        callbacks=[USAGE_HANDLER],
+    )
+    try:
+        return MCPAgent(
+            llm=request_llm,
+            client=client,
+            max_steps=30,
+            memory_enabled=False,
+            verbose=True,
+            stream_runnable=False,
+        )
+    except TypeError:
+        return MCPAgent(
+            llm=request_llm,
+            client=client,
+            max_steps=30,
+            memory_enabled=False,
+            verbose=True,
+        )
+
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize MCP client, LLM, and agent on app startup."""
-    global client, llm, agent
+    """Initialize MCP client, agents, and the answer cache on app startup."""
+    global client, embeddings, llm_cache
     client = MCPClient.from_dict(MCP_CONFIG)
-    llm = ChatOpenAI(
-        model=LLM_MODEL_NAME,
+    for streaming in (True, False):
+        await get_agent(streaming).initialize()
+    embeddings = OpenAIEmbeddings(
+        model=EMBEDDING_MODEL_NAME,
         openai_api_key=os.getenv("OPENAI_API_KEY"),
-        cache=False
     )
-    agent = MCPAgent(llm=llm, client=client, max_steps=30, verbose=True)
+    llm_cache = LLMCache(threshold=LLM_CACHE_THRESHOLD, ttl=LLM_CACHE_TTL)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the MCP sessions held by the shared agents."""
+    await client.close_all_sessions()
+
+
+# ---------------------------------------------------------------------
+# MCP Session Recovery
+# ---------------------------------------------------------------------
+# mcp_use turns a failed MCP call into this tool observation instead of raising
+MCP_TOOL_ERROR = "Error executing MCP tool"
+_reconnect_lock = asyncio.Lock()
+# Bumped after every reconnect, so requests that saw the same dead session reconnect once
+_connection_generation = 0
+
+
+def _sessions_alive() -> bool:
+    """True if the shared MCP sessions exist and every connector still reports a live connection."""
+    sessions = client.get_all_active_sessions()
+    return bool(sessions) and all(session.connector.is_connected for session in sessions.values())
+
+
+def _lost_connection(tool_calls: List[dict], final_result) -> bool:
+    """True if a finished run failed because its MCP session is gone rather than because of the question."""
+    if any(str(call["observation"]).startswith(MCP_TOOL_ERROR) for call in tool_calls):
+        return True
+    return (
+        isinstance(final_result, str)
+        and final_result.startswith("Agent stopped due to an error")
+        and not _sessions_alive()
+    )
+
+
+async def reconnect_agents(generation: int) -> None:
+    """
+    Close the shared MCP sessions and initialize both agents on fresh ones.
+
+    `generation` is the value of `_connection_generation` the caller ran with;
+    if another request already reconnected since then, this is a no-op.
+    """
+    global _connection_generation
+    async with _reconnect_lock:
+        if generation != _connection_generation:
+            return
+        for streaming in (True, False):
+            await get_agent(streaming).close()
+        for streaming in (True, False):
+            await get_agent(streaming).initialize()
+        _connection_generation += 1
 
 
 # ---------------------------------------------------------------------
@@ -80,6 +231,79 @@ async def serve_index():
     return FileResponse("test_client/frontend/index.html")
 
 
+# ---------------------------------------------------------------------
+# SSE Helpers
+# ---------------------------------------------------------------------
+def _sse(payload: dict) -> bytes:
+    """Encode a payload as a single SSE `data:` frame."""
+    return b"data: " + orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS) + b"\n\n"
+
+
+async def _coalesce(frames: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Re-yield SSE frames, batching frames that arrive close together.
+
+    The source generator runs in its own task, so a slow step never holds back
+    frames that are already encoded; at most SSE_FLUSH_BYTES are joined per chunk.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump():
+        try:
+            async for frame in frames:
+                await queue.put(frame)
+        finally:
+            await queue.put(None)
+
+    task = asyncio.create_task(pump())
+    buf = bytearray()
+    done = False
+    try:
+        while not done:
+            frame = await queue.get()
+            if frame is None:
+                break
+            buf += frame
+            if len(buf) < SSE_FLUSH_BYTES:
+                await asyncio.sleep(SSE_FLUSH_INTERVAL)
+            while len(buf) < SSE_FLUSH_BYTES and not queue.empty():
+                frame = queue.get_nowait()
+                if frame is None:
+                    done = True
+                    break
+                buf += frame
+            yield bytes(buf)
+            buf.clear()
+        # Surface errors raised inside the source generator
+        await task
+    finally:
+        task.cancel()
+
+
+def _cached_frames(cached: dict) -> List[bytes]:
+    """Encoded SSE frames of a cached answer, built on first replay and reused afterwards."""
+    if "frames" not in cached:
+        cached["frames"] = [
+            *map(_sse, cached["tool_calls"]),
+            _sse({"type": "result", "result": cached["result"]}),
+        ]
+    return cached["frames"]
+
+
+def _is_cacheable(final_result) -> bool:
+    """Only keep real answers; MCPAgent reports errors and the step limit as an "Agent stopped ..." result."""
+    return (
+        isinstance(final_result, str)
+        and bool(final_result.strip())
+        and not final_result.startswith("Agent stopped")
+    )
+
+
+# Cache hits spend no tokens, so their usage frame never changes
+CACHED_USAGE = {"total_tokens": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_cost": 0.0}
+CACHED_USAGE_FRAME = _sse({"type": "usage", "usage_metadata": CACHED_USAGE})
+
+
 # ---------------------------------------------------------------------
 # Chat Endpoint
 # ---------------------------------------------------------------------
@@ -96,129 +320,166 @@ async def ask(request: Request):
         history (List[ChatMessage], optional): Chat history.
 
     Returns:
-        JSONResponse or StreamingResponse: Depending on `stream` flag.
+        ORJSONResponse or EventSourceResponse: Depending on `stream` flag.
     """
     params = dict(request.query_params)
     stream = params.get("stream", "false").lower() == "true"
 
     try:
-        data = await request.json()
+        data = orjson.loads(await request.body())
     except Exception:
-        return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+        return ORJSONResponse({"error": "Invalid JSON"}, status_code=400)
 
     question = data.get("question")
     history = data.get("history", [])
 
-    with get_openai_callback() as cb:
-        request_llm = ChatOpenAI(
-            model=LLM_MODEL_NAME,
-            openai_api_key=os.getenv("OPENAI_API_KEY"),
-            cache=False,
-            streaming=True,
-            stream_usage=True,
-        )
+    # -------------------- Semantic Cache --------------------
+    cached = None
+    if LLM_CACHE_ENABLED:
+        question_embedding = await embeddings.aembed_query(question)
+        history_key = LLMCache.history_key(history)
+        cached = llm_cache.lookup(question_embedding, history_key)
 
-        try:
-            request_agent = MCPAgent(
-                llm=request_llm,
-                client=client,
-                max_steps=30,
-                verbose=True,
-                stream_runnable=False,
-            )
-        except TypeError:
-            request_agent = MCPAgent(
-                llm=request_llm,
-                client=client,
-                max_steps=30,
-                verbose=True,
-            )
-
-        # -------------------- Streaming Path --------------------
+    if cached is not None:
         if stream:
-            async def event_generator():
-                """Yield Server-Sent Events (SSE) for streaming responses."""
-                async for step in request_agent.stream(
-                    question,
-                    max_steps=None,
-                    manage_connector=True,
-                    external_history=history,
-                    track_execution=True,
-                ):
-                    if isinstance(step, tuple):
-                        action, observation = step
-                        yield "data: " + json.dumps({
-                            "type": "tool_call",
-                            "tool": getattr(action, 'tool', None),
-                            "tool_input": getattr(action, 'tool_input', None),
-                            "observation": observation,
-                            "llm_model_name": LLM_MODEL_NAME
-                        }) + "\n\n"
-                    else:
-                        yield "data: " + json.dumps({
-                            "type": "result",
-                            "result": step
-                        }) + "\n\n"
-
-                # Emit usage metadata at the end of the stream
-                usage_payload = {
-                    "total_tokens": getattr(cb, "total_tokens", None),
-                    "prompt_tokens": getattr(cb, "prompt_tokens", None),
-                    "completion_tokens": getattr(cb, "completion_tokens", None),
-                    "total_cost": getattr(cb, "total_cost", None),
-                }
-
-                yield "data: " + json.dumps({
-                    "type": "usage",
-                    "usage_metadata": usage_payload
-                }) + "\n\n"
-
-                yield "event: end\ndata: {}\n\n"
-
-            return StreamingResponse(event_generator(), media_type="text/event-stream")
-
-        # -------------------- Non-Streaming Path --------------------
-        tool_calls = []
-        final_result = None
-        async for step in request_agent.stream(
-            question,
-            max_steps=None,
-            manage_connector=True,
-            external_history=history,
-            track_execution=True,
-        ):
-            if isinstance(step, tuple):
-                action, observation = step
-                tool_calls.append({
-                    "type": "tool_call",
-                    "tool": getattr(action, 'tool', None),
-                    "tool_input": getattr(action, 'tool_input', None),
-                    "observation": observation,
-                    "llm_model_name": LLM_MODEL_NAME
+            async def cached_event_generator():
+                """Replay a cached answer using the same SSE framing as a live run."""
+                for frame in _cached_frames(cached):
+                    yield frame
+                yield CACHED_USAGE_FRAME
+                yield SSE_END_FRAME
+
+            return EventSourceResponse(_coalesce(cached_event_generator()), ping=SSE_PING_INTERVAL, sep=SSE_SEP)
+
+        return ORJSONResponse({
+            "result": cached["result"],
+            "tool_calls": cached["tool_calls"],
+            "usage_metadata": CACHED_USAGE
+        })
+
+    # The MCP server may have restarted since the last request
+    if not _sessions_alive():
+        await reconnect_agents(_connection_generation)
+
+    # Only the SSE path needs token streaming from the LLM
+    request_agent = get_agent(stream)
+
+    # -------------------- Streaming Path --------------------
+    if stream:
+        async def event_generator():
+            """Yield Server-Sent Events (SSE) for streaming responses."""
+            usage = track_usage()
+            for attempt in range(2):
+                generation = _connection_generation
+                tool_calls = []
+                frames = []
+                final_result = None
+                try:
+                    async for step in request_agent.stream(
+                        question,
+                        max_steps=None,
+                        manage_connector=False,
+                        external_history=history,
+                        track_execution=True,
+                    ):
+                        if isinstance(step, tuple):
+                            action, observation = step
+                            tool_call = {
+                                "type": "tool_call",
+                                "tool": getattr(action, 'tool', None),
+                                "tool_input": getattr(action, 'tool_input', None),
+                                "observation": observation,
+                                "llm_model_name": LLM_MODEL_NAME
+                            }
+                            tool_calls.append(tool_call)
+                            frame = _sse(tool_call)
+                        else:
+                            final_result = step
+                            frame = _sse({
+                                "type": "result",
+                                "result": step
+                            })
+                        frames.append(frame)
+                        yield frame
+                except Exception:
+                    if _sessions_alive():
+                        raise
+                    await reconnect_agents(generation)
+                    # Frames already sent cannot be taken back, so only an attempt that sent none is retried
+                    if attempt or frames:
+                        raise
+                    continue
+                if _lost_connection(tool_calls, final_result):
+                    # The failed answer is already streamed; reconnect so the next request works
+                    await reconnect_agents(generation)
+                break
+
+            if LLM_CACHE_ENABLED and _is_cacheable(final_result):
+                llm_cache.set(question_embedding, history_key, {
+                    "result": final_result,
+                    "tool_calls": tool_calls,
+                    "frames": frames,
                 })
-            else:
-                final_result = step
 
-        usage_payload = {
-            "total_tokens": getattr(cb, "total_tokens", None),
-            "prompt_tokens": getattr(cb, "prompt_tokens", None),
-            "completion_tokens": getattr(cb, "completion_tokens", None),
-            "total_cost": getattr(cb, "total_cost", None),
-        }
+            # Emit usage metadata at the end of the stream
+            usage_payload = usage_metadata(usage)
+
+            yield _sse({
+                "type": "usage",
+                "usage_metadata": usage_payload
+            })
+
+            yield SSE_END_FRAME
+
+        return EventSourceResponse(_coalesce(event_generator()), ping=SSE_PING_INTERVAL, sep=SSE_SEP)
+
+    # -------------------- Non-Streaming Path --------------------
+    # MCPAgent.run() drains this same generator and drops the steps,
+    # so iterate it here to keep the tool calls.
+    # A run that failed on a dead MCP session is retried once on a fresh one.
+    usage = track_usage()
+    for attempt in range(2):
+        generation = _connection_generation
+        tool_calls = []
+        final_result = None
+        try:
+            async for step in request_agent.stream(
+                question,
+                max_steps=None,
+                manage_connector=False,
+                external_history=history,
+                track_execution=True,
+            ):
+                if isinstance(step, tuple):
+                    action, observation = step
+                    tool_calls.append({
+                        "type": "tool_call",
+                        "tool": getattr(action, 'tool', None),
+                        "tool_input": getattr(action, 'tool_input', None),
+                        "observation": observation,
+                        "llm_model_name": LLM_MODEL_NAME
+                    })
+                else:
+                    final_result = step
+        except Exception:
+            if attempt or _sessions_alive():
+                raise
+            await reconnect_agents(generation)
+            continue
+        if attempt or not _lost_connection(tool_calls, final_result):
+            break
+        await reconnect_agents(generation)
+
+    usage_payload = usage_metadata(usage)
+
+    if LLM_CACHE_ENABLED and _is_cacheable(final_result):
+        llm_cache.set(question_embedding, history_key, {"result": final_result, "tool_calls": tool_calls})
 
     # Debug log (can be removed in production)
     print("USAGE metadata (non-stream):", usage_payload, flush=True)
 
-    return JSONResponse({
+    return ORJSONResponse({
         "result": final_result,
         "tool_calls": tool_calls,
         "usage_metadata": usage_payload
     })
-
-
-# ---------------------------------------------------------------------
-# Optional CLI Entry Point
-# ---------------------------------------------------------------------
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=3000, reload=True)
@@ -0,0 +1,19 @@
+import os
+
+import uvicorn
+
+# ---------------------------------------------------------------------
+# CLI Entry Point: python -m test_client
+# ---------------------------------------------------------------------
+if os.getenv("DEV_RELOAD", "false").lower() == "true":
+    uvicorn.run("test_client:app", host="0.0.0.0", port=3000, reload=True)
+else:
+    # Each worker keeps its own agents and in-process answer cache, so more than one is opt-in
+    uvicorn.run(
+        "test_client:app",
+        host="0.0.0.0",
+        port=3000,
+        workers=int(os.getenv("WORKERS", "1")),
+        loop="uvloop",
+        http="httptools",
+    )
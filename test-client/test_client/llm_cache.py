@@ -0,0 +1,72 @@
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import orjson
+
+
+# ---------------------------------------------------------------------
+# Semantic Response Cache
+# ---------------------------------------------------------------------
+@dataclass
+class CacheEntry:
+    """A cached answer together with the question embedding it was stored under."""
+    embedding: np.ndarray
+    history_key: str
+    value: Dict[str, Any]
+    expires_at: float
+
+
+class LLMCache:
+    """
+    In-process semantic cache for `/ask` answers.
+
+    A lookup hits when a stored question has the same chat history and a
+    cosine similarity of at least `threshold` to the incoming question.
+    Entries expire after `ttl` seconds; the oldest entry is evicted once
+    `max_entries` is reached.
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl: float = 3600, max_entries: int = 1024):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: List[CacheEntry] = []
+
+    @staticmethod
+    def history_key(history: Optional[List[Any]]) -> str:
+        """Stable key for a chat history, so answers are only reused in the same context."""
+        encoded = orjson.dumps(history or [], default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        return hashlib.sha256(encoded).hexdigest()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        return vec / (np.linalg.norm(vec) or 1.0)
+
+    def lookup(self, embedding: List[float], history_key: str) -> Optional[Dict[str, Any]]:
+        """Return the closest cached answer above the threshold, or None."""
+        now = time.monotonic()
+        self._entries = [e for e in self._entries if e.expires_at > now]
+        candidates = [e for e in self._entries if e.history_key == history_key]
+        if not candidates:
+            return None
+        query = self._normalize(embedding)
+        sims = np.stack([e.embedding for e in candidates]) @ query
+        best = int(np.argmax(sims))
+        if sims[best] < self.threshold:
+            return None
+        return candidates[best].value
+
+    def set(self, embedding: List[float], history_key: str, value: Dict[str, Any]) -> None:
+        """Store an answer (`result`, `tool_calls` and optionally encoded SSE `frames`) for the given question embedding."""
+        if len(self._entries) >= self.max_entries:
+            self._entries.pop(0)
+        self._entries.append(CacheEntry(
+            embedding=self._normalize(embedding),
+            history_key=history_key,
+            value=value,
+            expires_at=time.monotonic() + self.ttl,
+        ))
@@ -8,6 +8,27 @@ class Book:
     title: str
     author: str
 
+# Static data, built once at import and shared by every request
+ALL_BOOKS: tuple[Book, ...] = (
+    Book(title="1984", author="George Orwell"),
+    Book(title="A Brief History of Time", author="Stephen Hawking"),
+    Book(title="The Selfish Gene", author="Richard Dawkins"),
+    Book(title="Cosmos", author="Carl Sagan"),
+    Book(title="The Origin of Species", author="Charles Darwin"),
+    Book(title="The Elegant Universe", author="Brian Greene"),
+    Book(title="Silent Spring", author="Rachel Carson"),
+    Book(title="The Double Helix", author="James D. Watson"),
+    Book(title="Why We Sleep", author="Matthew Walker"),
+    Book(title="Gödel, Escher, Bach", author="Douglas Hofstadter"),
+    Book(title="Surely You're Joking, Mr. Feynman!", author="Richard P. Feynman"),
+    Book(title="Pale Blue Dot", author="Carl Sagan"),
+)
+
+BOOKS_BY_AUTHOR: dict[str, tuple[Book, ...]] = {
+    author: tuple(book for book in ALL_BOOKS if book.author == author)
+    for author in dict.fromkeys(book.author for book in ALL_BOOKS)
+}
+
 # Query definition
 @strawberry.type
 class Query:
@@ -17,24 +38,9 @@ class Query:
 
     @strawberry.field
     def books(self, author: Optional[str] = None) -> list[Book]:
-        all_books = [
-            Book(title="1984", author="George Orwell"),
-            Book(title="A Brief History of Time", author="Stephen Hawking"),
-            Book(title="The Selfish Gene", author="Richard Dawkins"),
-            Book(title="Cosmos", author="Carl Sagan"),
-            Book(title="The Origin of Species", author="Charles Darwin"),
-            Book(title="The Elegant Universe", author="Brian Greene"),
-            Book(title="Silent Spring", author="Rachel Carson"),
-            Book(title="The Double Helix", author="James D. Watson"),
-            Book(title="Why We Sleep", author="Matthew Walker"),
-            Book(title="Gödel, Escher, Bach", author="Douglas Hofstadter"),
-            Book(title="Surely You're Joking, Mr. Feynman!", author="Richard P. Feynman"),
-            Book(title="Pale Blue Dot", author="Carl Sagan")
-        ]
-
         if author:
-            return [book for book in all_books if book.author == author]
-        return all_books
+            return BOOKS_BY_AUTHOR.get(author, ())
+        return ALL_BOOKS
 
 # Mutation example
 @strawberry.type
@@ -1,14 +1,10 @@
 import strawberry
 import enum
+from dataclasses import dataclass
 from typing import List
 from strawberry.asgi import GraphQL
-from faker import Faker
-import random
-
-FAKER_SEED = 42
-faker = Faker()
-faker.seed_instance(FAKER_SEED)
-random.seed(FAKER_SEED)
+from strawberry.extensions import ParserCache, QueryDepthLimiter, ValidationCache
+import functools
 
 # ---- ENUMS ----
 @strawberry.enum
@@ -28,97 +24,115 @@ class Language(enum.Enum):
     ZH = "ZH"
 
 # ---- DATA CLASSES ----
+# Slotted dataclasses: no per-instance __dict__, and faster attribute reads while resolving
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Location:
     city: str
     country: str
     address: str
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Award:
     name: str
     year: int
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Review:
     reviewer: str
     rating: float
     comment: str
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Genre:
     name: str
     description: str
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Employee:
     name: str
     position: str
     email: str
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Store:
     name: str
     location: Location
     employees: List[Employee]
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Shipment:
     tracking_number: str
     shipped_date: str
     delivered_date: str
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Warehouse:
     name: str
     location: Location
     shipments: List[Shipment]
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Membership:
     member_id: str
     start_date: str
     end_date: str
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Subscription:
     type: str
     active: bool
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Agency:
     name: str
     clients: List["Client"]
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Client:
     name: str
     agency: "Agency" = None  # Filled after creation
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Currency:
     code: str
     name: str
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Contract:
     contract_id: str
     signed_date: str
     parties: List[str]
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Event:
     name: str
     date: str
     location: Location
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class LanguageInfo:
     language: Language
     proficiency: str
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Author:
     name: str
     bio: str
@@ -128,6 +142,7 @@ class Author:
     books: List["Book"] = None  # Filled after creation
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Publisher:
     name: str
     location: Location
@@ -136,6 +151,7 @@ class Publisher:
     warehouses: List[Warehouse]
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Distributor:
     name: str
     location: Location
@@ -143,6 +159,7 @@ class Distributor:
     contracts: List[Contract]
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Seller:
     name: str
     location: Location
@@ -150,6 +167,7 @@ class Seller:
     store: Store
 
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class Book:
     title: str
     author: Author
@@ -172,159 +190,13 @@ class Book:
     currency: Currency
     language_info: LanguageInfo
 
-# ---- PRE-GENERATE DATA ----
-
-NUM_BOOKS = 8
-NUM_AUTHORS = 5
-NUM_PUBLISHERS = 3
-NUM_DISTRIBUTORS = 3
-NUM_SELLERS = 4
-NUM_GENRES = 4
-NUM_AWARDS = 4
-NUM_REVIEWS = 6
-NUM_EMPLOYEES = 10
-NUM_STORES = 2
-NUM_SHIPMENTS = 6
-NUM_WAREHOUSES = 2
-NUM_MEMBERSHIPS = 4
-NUM_SUBSCRIPTIONS = 3
-NUM_AGENCIES = 2
-NUM_CLIENTS = 3
-NUM_CURRENCIES = 2
-NUM_CONTRACTS = 2
-NUM_EVENTS = 2
-NUM_LANGUAGEINFOS = 3
-
-def gen_locations(n):
-    return [Location(city=faker.city(), country=faker.country(), address=faker.address()) for _ in range(n)]
-
-LOCATIONS = gen_locations(NUM_PUBLISHERS + NUM_DISTRIBUTORS + NUM_SELLERS + NUM_STORES + NUM_WAREHOUSES)
-
-AWARDS = [Award(name=faker.word().title() + " Award", year=int(faker.year())) for _ in range(NUM_AWARDS)]
-REVIEWS = [Review(reviewer=faker.name(), rating=round(faker.random.uniform(1,5),1), comment=faker.sentence()) for _ in range(NUM_REVIEWS)]
-GENRES = [Genre(name=faker.word().title(), description=faker.text(max_nb_chars=60)) for _ in range(NUM_GENRES)]
-EMPLOYEES = [Employee(name=faker.name(), position=faker.job(), email=faker.email()) for _ in range(NUM_EMPLOYEES)]
-SHIPMENTS = [Shipment(tracking_number=faker.uuid4(), shipped_date=faker.date(), delivered_date=faker.date()) for _ in range(NUM_SHIPMENTS)]
-MEMBERSHIPS = [Membership(member_id=faker.uuid4(), start_date=faker.date(), end_date=faker.date()) for _ in range(NUM_MEMBERSHIPS)]
-SUBSCRIPTIONS = [Subscription(type=faker.word(), active=faker.boolean()) for _ in range(NUM_SUBSCRIPTIONS)]
-CURRENCIES = [Currency(code=faker.currency_code(), name=faker.currency_name()) for _ in range(NUM_CURRENCIES)]
-CONTRACTS = [Contract(
-    contract_id=faker.uuid4(), signed_date=faker.date(), parties=[faker.company() for _ in range(2)]
-) for _ in range(NUM_CONTRACTS)]
-EVENTS = [Event(name=faker.word().title() + " Event", date=faker.date(), location=LOCATIONS[i%len(LOCATIONS)]) for i in range(NUM_EVENTS)]
-LANGUAGEINFOS = [LanguageInfo(language=Language.EN, proficiency=faker.word()) for _ in range(NUM_LANGUAGEINFOS)]
-
-# Stores and Warehouses
-STORES = [Store(name=faker.company(), location=LOCATIONS[NUM_PUBLISHERS+i], employees=EMPLOYEES[i*2:(i+1)*2]) for i in range(NUM_STORES)]
-WAREHOUSES = [Warehouse(name=faker.company(), location=LOCATIONS[NUM_PUBLISHERS+NUM_DISTRIBUTORS+i], shipments=SHIPMENTS[i*3:(i+1)*3]) for i in range(NUM_WAREHOUSES)]
-
-# Agencies/Clients
-AGENCIES = []
-CLIENTS = []
-for i in range(NUM_AGENCIES):
-    CL = [Client(name=faker.name()) for _ in range(NUM_CLIENTS)]
-    AGENCIES.append(Agency(name=faker.company(), clients=CL))
-    for c in CL:
-        c.agency = AGENCIES[-1]
-    CLIENTS.extend(CL)
-
-# Authors (empty books list for now, will fill later after Book creation)
-AUTHORS = [
-    Author(
-        name=faker.name(),
-        bio=faker.text(max_nb_chars=120),
-        location=LOCATIONS[i%len(LOCATIONS)],
-        awards=[AWARDS[i%len(AWARDS)]],
-        agency=AGENCIES[i%len(AGENCIES)],
-    )
-    for i in range(NUM_AUTHORS)
-]
-
-# Publishers (empty books list for now, will fill later)
-PUBLISHERS = [
-    Publisher(
-        name=faker.company(),
-        location=LOCATIONS[i%len(LOCATIONS)],
-        employees=EMPLOYEES[i*3:(i+1)*3],
-        warehouses=WAREHOUSES
-    )
-    for i in range(NUM_PUBLISHERS)
-]
-
-# Distributors (empty owned_books for now)
-DISTRIBUTORS = [
-    Distributor(
-        name=faker.company(),
-        location=LOCATIONS[(NUM_PUBLISHERS+i)%len(LOCATIONS)],
-        contracts=CONTRACTS,
-    )
-    for i in range(NUM_DISTRIBUTORS)
-]
-
-# Sellers (empty books_for_sale for now)
-SELLERS = [
-    Seller(
-        name=faker.company(),
-        location=LOCATIONS[(NUM_PUBLISHERS+NUM_DISTRIBUTORS+i)%len(LOCATIONS)],
-        store=STORES[i%len(STORES)],
-    )
-    for i in range(NUM_SELLERS)
-]
-
-# Now, create the books, and fill in all references!
-BOOKS = []
-for i in range(NUM_BOOKS):
-    # Distribute related objects round-robin
-    author = AUTHORS[i % NUM_AUTHORS]
-    publisher = PUBLISHERS[i % NUM_PUBLISHERS]
-    distributor = DISTRIBUTORS[i % NUM_DISTRIBUTORS]
-    sellers = [SELLERS[i % NUM_SELLERS]]
-    awards = [AWARDS[i % len(AWARDS)]]
-    reviews = [REVIEWS[i % len(REVIEWS)]]
-    events = [EVENTS[i % len(EVENTS)]]
-    warehouse = WAREHOUSES[i % len(WAREHOUSES)]
-    shipments = [SHIPMENTS[i % len(SHIPMENTS)]]
-    membership = MEMBERSHIPS[i % len(MEMBERSHIPS)]
-    subscription = SUBSCRIPTIONS[i % len(SUBSCRIPTIONS)]
-    agency = author.agency
-    contract = CONTRACTS[i % len(CONTRACTS)]
-    currency = CURRENCIES[i%len(CURRENCIES)]
-    language_info = LANGUAGEINFOS[i % len(LANGUAGEINFOS)]
-    genre = GENRES[i % len(GENRES)]
-    
-    book = Book(
-        title=faker.sentence(nb_words=4),
-        author=author,
-        publisher=publisher,
-        distributor=distributor,
-        sellers=sellers,
-        genre=genre,
-        published_year=int(faker.year()),
-        format=BookFormat.HARDCOVER,
-        language=Language.EN,
-        awards=awards,
-        reviews=reviews,
-        events=events,
-        warehouse=warehouse,
-        shipments=shipments,
-        membership=membership,
-        subscription=subscription,
-        agency=agency,
-        contract=contract,
-        currency=currency,
-        language_info=language_info,
-    )
-    BOOKS.append(book)
-
-# Fill backrefs
-for a in AUTHORS:
-    a.books = [b for b in BOOKS if b.author is a]
-for p in PUBLISHERS:
-    p.books = [b for b in BOOKS if b.publisher is p]
-for d in DISTRIBUTORS:
-    d.owned_books = [b for b in BOOKS if b.distributor is d]
-for s in SELLERS:
-    s.books_for_sale = [b for b in BOOKS if s in b.sellers]
+# ---- SEED DATA ----
+
+@functools.cache
+def seed_data():
+    """Seeded sample data (the `seed` module), generated on first use."""
+    from test_graphql_server import seed
+    return seed
 
 # ---- QUERY AND MUTATION ----
 
@@ -332,83 +204,83 @@ for s in SELLERS:
 class Query:
     @strawberry.field
     def books(self) -> List[Book]:
-        return BOOKS
+        return seed_data().BOOKS
 
     @strawberry.field
     def authors(self) -> List[Author]:
-        return AUTHORS
+        return seed_data().AUTHORS
 
     @strawberry.field
     def publishers(self) -> List[Publisher]:
-        return PUBLISHERS
+        return seed_data().PUBLISHERS
 
     @strawberry.field
     def distributors(self) -> List[Distributor]:
-        return DISTRIBUTORS
+        return seed_data().DISTRIBUTORS
 
     @strawberry.field
     def sellers(self) -> List[Seller]:
-        return SELLERS
+        return seed_data().SELLERS
 
     @strawberry.field
     def genres(self) -> List[Genre]:
-        return GENRES
+        return seed_data().GENRES
 
     @strawberry.field
     def awards(self) -> List[Award]:
-        return AWARDS
+        return seed_data().AWARDS
 
     @strawberry.field
     def reviews(self) -> List[Review]:
-        return REVIEWS
+        return seed_data().REVIEWS
 
     @strawberry.field
     def stores(self) -> List[Store]:
-        return STORES
+        return seed_data().STORES
 
     @strawberry.field
     def employees(self) -> List[Employee]:
-        return EMPLOYEES
+        return seed_data().EMPLOYEES
 
     @strawberry.field
     def shipments(self) -> List[Shipment]:
-        return SHIPMENTS
+        return seed_data().SHIPMENTS
 
     @strawberry.field
     def warehouses(self) -> List[Warehouse]:
-        return WAREHOUSES
+        return seed_data().WAREHOUSES
 
     @strawberry.field
     def memberships(self) -> List[Membership]:
-        return MEMBERSHIPS
+        return seed_data().MEMBERSHIPS
 
     @strawberry.field
     def subscriptions(self) -> List[Subscription]:
-        return SUBSCRIPTIONS
+        return seed_data().SUBSCRIPTIONS
 
     @strawberry.field
     def agencies(self) -> List[Agency]:
-        return AGENCIES
+        return seed_data().AGENCIES
 
     @strawberry.field
     def clients(self) -> List[Client]:
-        return CLIENTS
+        return seed_data().CLIENTS
 
     @strawberry.field
     def currencies(self) -> List[Currency]:
-        return CURRENCIES
+        return seed_data().CURRENCIES
 
     @strawberry.field
     def contracts(self) -> List[Contract]:
-        return CONTRACTS
+        return seed_data().CONTRACTS
 
     @strawberry.field
     def events(self) -> List[Event]:
-        return EVENTS
+        return seed_data().EVENTS
 
     @strawberry.field
     def language_infos(self) -> List[LanguageInfo]:
-        return LANGUAGEINFOS
+        return seed_data().LANGUAGEINFOS
 
     @strawberry.field
     def hello(self) -> str:
@@ -419,8 +291,23 @@ class Mutation:
     @strawberry.mutation
     def add_book(self, title: str, author_name: str, publisher_name: str) -> Book:
         # No-op: Just return first book (demo purposes)
-        return BOOKS[0]
-
-schema = strawberry.Schema(query=Query, mutation=Mutation)
-app = GraphQL(schema)
+        return seed_data().BOOKS[0]
+
+# The MCP client re-sends the same documents; reuse their parsed AST and validation result.
+# Types reference each other in cycles (Agency <-> Client, Book <-> Author, ...), so cap the
+# selection depth to keep a runaway query from serializing an ever larger response.
+MAX_QUERY_DEPTH = 10
+
+schema = strawberry.Schema(
+    query=Query,
+    mutation=Mutation,
+    extensions=[
+        QueryDepthLimiter(max_depth=MAX_QUERY_DEPTH),
+        ParserCache(maxsize=512),
+        ValidationCache(maxsize=512),
+    ],
+)
+
+# The MCP server only POSTs; GraphiQL stays available for manual exploration
+app = GraphQL(schema, allow_queries_via_get=False)
 graphql_app = app
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+Seeded sample data for the massive schema.
+
+Imported on first use by the Query resolvers in `main`, so importing the
+schema (e.g. for introspection) does not pay for Faker and data generation.
+"""
+from collections import defaultdict
+import random
+
+from faker import Faker
+
+from test_graphql_server.main import (
+    Location,
+    Award,
+    Review,
+    Genre,
+    Employee,
+    Store,
+    Shipment,
+    Warehouse,
+    Membership,
+    Subscription,
+    Agency,
+    Client,
+    Currency,
+    Contract,
+    Event,
+    LanguageInfo,
+    Author,
+    Publisher,
+    Distributor,
+    Seller,
+    Book,
+    BookFormat,
+    Language,
+)
+
+FAKER_SEED = 42
+# Only the providers the data below draws from; the seeded output is unchanged
+FAKER_PROVIDERS = [
+    f"faker.providers.{name}"
+    for name in ("address", "company", "currency", "date_time", "internet", "job", "lorem", "misc", "person")
+]
+faker = Faker("en_US", providers=FAKER_PROVIDERS)
+faker.seed_instance(FAKER_SEED)
+random.seed(FAKER_SEED)
+
+# ---- PRE-GENERATE DATA ----
+
+NUM_BOOKS = 8
+NUM_AUTHORS = 5
+NUM_PUBLISHERS = 3
+NUM_DISTRIBUTORS = 3
+NUM_SELLERS = 4
+NUM_GENRES = 4
+NUM_AWARDS = 4
+NUM_REVIEWS = 6
+NUM_EMPLOYEES = 10
+NUM_STORES = 2
+NUM_SHIPMENTS = 6
+NUM_WAREHOUSES = 2
+NUM_MEMBERSHIPS = 4
+NUM_SUBSCRIPTIONS = 3
+NUM_AGENCIES = 2
+NUM_CLIENTS = 3
+NUM_CURRENCIES = 2
+NUM_CONTRACTS = 2
+NUM_EVENTS = 2
+NUM_LANGUAGEINFOS = 3
+
+def gen_locations(n):
+    return [Location(city=faker.city(), country=faker.country(), address=faker.address()) for _ in range(n)]
+
+LOCATIONS = gen_locations(NUM_PUBLISHERS + NUM_DISTRIBUTORS + NUM_SELLERS + NUM_STORES + NUM_WAREHOUSES)
+
+AWARDS = [Award(name=faker.word().title() + " Award", year=int(faker.year())) for _ in range(NUM_AWARDS)]
+REVIEWS = [Review(reviewer=faker.name(), rating=round(faker.random.uniform(1,5),1), comment=faker.sentence()) for _ in range(NUM_REVIEWS)]
+GENRES = [Genre(name=faker.word().title(), description=faker.text(max_nb_chars=60)) for _ in range(NUM_GENRES)]
+EMPLOYEES = [Employee(name=faker.name(), position=faker.job(), email=faker.email()) for _ in range(NUM_EMPLOYEES)]
+SHIPMENTS = [Shipment(tracking_number=faker.uuid4(), shipped_date=faker.date(), delivered_date=faker.date()) for _ in range(NUM_SHIPMENTS)]
+MEMBERSHIPS = [Membership(member_id=faker.uuid4(), start_date=faker.date(), end_date=faker.date()) for _ in range(NUM_MEMBERSHIPS)]
+SUBSCRIPTIONS = [Subscription(type=faker.word(), active=faker.boolean()) for _ in range(NUM_SUBSCRIPTIONS)]
+CURRENCIES = [Currency(code=faker.currency_code(), name=faker.currency_name()) for _ in range(NUM_CURRENCIES)]
+CONTRACTS = [Contract(
+    contract_id=faker.uuid4(), signed_date=faker.date(), parties=[faker.company() for _ in range(2)]
+) for _ in range(NUM_CONTRACTS)]
+EVENTS = [Event(name=faker.word().title() + " Event", date=faker.date(), location=LOCATIONS[i%len(LOCATIONS)]) for i in range(NUM_EVENTS)]
+LANGUAGEINFOS = [LanguageInfo(language=Language.EN, proficiency=faker.word()) for _ in range(NUM_LANGUAGEINFOS)]
+
+# Stores and Warehouses
+STORES = [Store(name=faker.company(), location=LOCATIONS[NUM_PUBLISHERS+i], employees=EMPLOYEES[i*2:(i+1)*2]) for i in range(NUM_STORES)]
+WAREHOUSES = [Warehouse(name=faker.company(), location=LOCATIONS[NUM_PUBLISHERS+NUM_DISTRIBUTORS+i], shipments=SHIPMENTS[i*3:(i+1)*3]) for i in range(NUM_WAREHOUSES)]
+
+# Agencies/Clients
+AGENCIES = []
+CLIENTS = []
+for i in range(NUM_AGENCIES):
+    CL = [Client(name=faker.name()) for _ in range(NUM_CLIENTS)]
+    AGENCIES.append(Agency(name=faker.company(), clients=CL))
+    for c in CL:
+        c.agency = AGENCIES[-1]
+    CLIENTS.extend(CL)
+
+# Authors (empty books list for now, will fill later after Book creation)
+AUTHORS = [
+    Author(
+        name=faker.name(),
+        bio=faker.text(max_nb_chars=120),
+        location=LOCATIONS[i%len(LOCATIONS)],
+        awards=[AWARDS[i%len(AWARDS)]],
+        agency=AGENCIES[i%len(AGENCIES)],
+    )
+    for i in range(NUM_AUTHORS)
+]
+
+# Publishers (empty books list for now, will fill later)
+PUBLISHERS = [
+    Publisher(
+        name=faker.company(),
+        location=LOCATIONS[i%len(LOCATIONS)],
+        employees=EMPLOYEES[i*3:(i+1)*3],
+        warehouses=WAREHOUSES
+    )
+    for i in range(NUM_PUBLISHERS)
+]
+
+# Distributors (empty owned_books for now)
+DISTRIBUTORS = [
+    Distributor(
+        name=faker.company(),
+        location=LOCATIONS[(NUM_PUBLISHERS+i)%len(LOCATIONS)],
+        contracts=CONTRACTS,
+    )
+    for i in range(NUM_DISTRIBUTORS)
+]
+
+# Sellers (empty books_for_sale for now)
+SELLERS = [
+    Seller(
+        name=faker.company(),
+        location=LOCATIONS[(NUM_PUBLISHERS+NUM_DISTRIBUTORS+i)%len(LOCATIONS)],
+        store=STORES[i%len(STORES)],
+    )
+    for i in range(NUM_SELLERS)
+]
+
+# Single-element lists, built once per referenced object and shared by every book
+# that points at it (the data is read-only after import)
+SELLERS_SINGLES = [[x] for x in SELLERS]
+AWARDS_SINGLES = [[x] for x in AWARDS]
+REVIEWS_SINGLES = [[x] for x in REVIEWS]
+EVENTS_SINGLES = [[x] for x in EVENTS]
+SHIPMENTS_SINGLES = [[x] for x in SHIPMENTS]
+
+# Now, create the books, and fill in all references!
+BOOKS = []
+for i in range(NUM_BOOKS):
+    # Distribute related objects round-robin
+    author = AUTHORS[i % NUM_AUTHORS]
+    publisher = PUBLISHERS[i % NUM_PUBLISHERS]
+    distributor = DISTRIBUTORS[i % NUM_DISTRIBUTORS]
+    sellers = SELLERS_SINGLES[i % NUM_SELLERS]
+    awards = AWARDS_SINGLES[i % len(AWARDS)]
+    reviews = REVIEWS_SINGLES[i % len(REVIEWS)]
+    events = EVENTS_SINGLES[i % len(EVENTS)]
+    warehouse = WAREHOUSES[i % len(WAREHOUSES)]
+    shipments = SHIPMENTS_SINGLES[i % len(SHIPMENTS)]
+    membership = MEMBERSHIPS[i % len(MEMBERSHIPS)]
+    subscription = SUBSCRIPTIONS[i % len(SUBSCRIPTIONS)]
+    agency = author.agency
+    contract = CONTRACTS[i % len(CONTRACTS)]
+    currency = CURRENCIES[i%len(CURRENCIES)]
+    language_info = LANGUAGEINFOS[i % len(LANGUAGEINFOS)]
+    genre = GENRES[i % len(GENRES)]
+    
+    book = Book(
+        title=faker.sentence(nb_words=4),
+        author=author,
+        publisher=publisher,
+        distributor=distributor,
+        sellers=sellers,
+        genre=genre,
+        published_year=int(faker.year()),
+        format=BookFormat.HARDCOVER,
+        language=Language.EN,
+        awards=awards,
+        reviews=reviews,
+        events=events,
+        warehouse=warehouse,
+        shipments=shipments,
+        membership=membership,
+        subscription=subscription,
+        agency=agency,
+        contract=contract,
+        currency=currency,
+        language_info=language_info,
+    )
+    BOOKS.append(book)
+
+# Fill backrefs: group books by referenced object in one pass, keeping BOOKS order
+books_by_author = defaultdict(list)
+books_by_publisher = defaultdict(list)
+books_by_distributor = defaultdict(list)
+books_by_seller = defaultdict(list)
+for b in BOOKS:
+    books_by_author[id(b.author)].append(b)
+    books_by_publisher[id(b.publisher)].append(b)
+    books_by_distributor[id(b.distributor)].append(b)
+    for s in b.sellers:
+        books_by_seller[id(s)].append(b)
+for a in AUTHORS:
+    a.books = books_by_author[id(a)]
+for p in PUBLISHERS:
+    p.books = books_by_publisher[id(p)]
+for d in DISTRIBUTORS:
+    d.owned_books = books_by_distributor[id(d)]
+for s in SELLERS:
+    s.books_for_sale = books_by_seller[id(s)]
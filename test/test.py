@@ -1,9 +1,12 @@
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from mcp_use import MCPClient, MCPAgent
-import pandas as pd
 import asyncio
+import glob
+import os
 import subprocess
+import sys
+import threading
 
 config = {
     "mcpServers": {
@@ -13,11 +16,29 @@ config = {
     }
 }
 
+RELEASE_BINARY = "target/release/graphql-mcp"
+BUILD_INPUTS = ["Cargo.toml", "Cargo.lock", "src/**/*.rs"]
+
+def release_binary_is_fresh():
+    """
+    Returns True if the release binary exists and is newer than every
+    build input, so 'cargo build --release' would have nothing to do.
+    """
+    try:
+        binary_mtime = os.path.getmtime(RELEASE_BINARY)
+    except OSError:
+        return False
+    inputs = [p for pattern in BUILD_INPUTS for p in glob.glob(pattern, recursive=True)]
+    return all(os.path.getmtime(p) < binary_mtime for p in inputs)
+
 def run_cargo_build():
     """
     Runs 'cargo build --release' and prints the build output.
     Raises an exception if the build fails.
     """
+    if release_binary_is_fresh():
+        print("MCP server binary is up to date; skipping cargo build.")
+        return
     print("Building MCP server (cargo build --release)...")
     try:
         result = subprocess.run(
@@ -33,9 +54,35 @@ def run_cargo_build():
         print(e.stderr)
         raise
 
+def start_stdin_reader(loop, lines):
+    """
+    Feeds stdin into the asyncio queue 'lines' from a daemon thread, one
+    line per item and None at EOF. The raw fd is read instead of sys.stdin,
+    so the thread holds no interpreter lock and Ctrl-C never waits for Enter.
+    """
+    def push(item):
+        try:
+            loop.call_soon_threadsafe(lines.put_nowait, item)
+        except RuntimeError:
+            return False  # The loop already shut down
+        return True
+
+    def worker():
+        buf = b""
+        while chunk := os.read(sys.stdin.fileno(), 4096):
+            *complete, buf = (buf + chunk).split(b"\n")
+            for line in complete:
+                if not push(line.decode(errors="replace").rstrip("\r")):
+                    return
+        if buf:
+            push(buf.decode(errors="replace"))
+        push(None)
+
+    threading.Thread(target=worker, daemon=True).start()
+
 async def main():
     load_dotenv()
-    
+
     try:
         run_cargo_build()
     except Exception:
@@ -44,16 +91,32 @@ async def main():
     client = MCPClient.from_dict(config)
     llm = ChatOpenAI(model="gpt-4o-mini")
     agent = MCPAgent(llm=llm, client=client, max_steps=30)
-    
-    while True:
-        # Read user input; exit interactive loop if the user types "exit" or "quit"
-        user_input = input("\nEnter your question (or type 'exit' to quit): ")
-        if user_input.lower() in ('exit', 'quit'):
-            print("Exiting interactive CLI.")
-            break
-        
-        result = await agent.run(user_input)
-        print(f"\nResult: {result}")
+
+    try:
+        # Open the SSE session once and reuse it for every prompt
+        await agent.initialize()
+
+        # Read user input off the event loop so the SSE session keeps being serviced
+        lines = asyncio.Queue()
+        start_stdin_reader(asyncio.get_running_loop(), lines)
+
+        while True:
+            # Exit interactive loop if the user types "exit" or "quit", or stdin is closed
+            print("\nEnter your question (or type 'exit' to quit): ", end="", flush=True)
+            user_input = await lines.get()
+            if user_input is None:
+                user_input = "exit"
+            if user_input.lower() in ('exit', 'quit'):
+                print("Exiting interactive CLI.")
+                break
+
+            result = await agent.run(user_input, manage_connector=False)
+            print(f"\nResult: {result}")
+    finally:
+        await client.close_all_sessions()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nExiting interactive CLI.")